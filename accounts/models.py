@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from main import images
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -15,6 +16,8 @@ class UserProfile(models.Model):
     college = models.CharField(max_length=200, blank=True)
     graduation_year = models.IntegerField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Resized WebP/JPEG copies written by main.images in the background
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     total_tests_taken = models.PositiveIntegerField(default=0)
     total_articles_read = models.PositiveIntegerField(default=0)
     streak_days = models.PositiveIntegerField(default=0)
@@ -41,4 +44,8 @@ def save_user_profile(sender, instance, **kwargs):
         instance.userprofile.save()
     except UserProfile.DoesNotExist:
         # Create a profile for existing user if missing
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+@receiver(post_save, sender=UserProfile)
+def generate_profile_picture_variants(sender, instance, **kwargs):
+    images.schedule_variants(instance, 'profile_picture', 'profile_picture_variants')
\ No newline at end of file
@@ -1,10 +1,13 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Avg, Max, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta, datetime
+from main import page_cache
+from main.conditional import add_validators, make_etag, not_modified
+from main.taxonomy import get_taxonomy
 from main.models import Article, Subject
 from tests.models import MockTest, TestAttempt, Question
 from accounts.models import UserProfile
@@ -49,25 +52,38 @@ def performance_data(request):
     user = request.user
     attempts = TestAttempt.objects.filter(user=user, is_completed=True).order_by('completed_at')
     
+    # Subject names and test subjects are rendered too, so the ETag covers their generations
+    # and there is no Last-Modified to go stale on a rename
+    state = attempts.aggregate(count=Count('id'), latest=Max('completed_at'))
+    etag = make_etag(
+        'performance', user.pk, state['count'], state['latest'],
+        *page_cache.generations(('subject', 'mocktest')),
+    )
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+    
     data = {
         'dates': [attempt.completed_at.strftime('%Y-%m-%d') for attempt in attempts],
         'scores': [float(attempt.percentage) for attempt in attempts],
         'subjects': [],
     }
     
-    # Subject-wise performance
-    subjects = Subject.objects.all()
-    for subject in subjects:
-        subject_attempts = attempts.filter(mock_test__subject=subject)
-        if subject_attempts.exists():
-            avg_score = subject_attempts.aggregate(avg=Avg('percentage'))['avg'] or 0
+    # Subject-wise performance in one grouped query, named and ordered by the taxonomy
+    per_subject = {
+        row['mock_test__subject_id']: row
+        for row in attempts.order_by().values('mock_test__subject_id').annotate(avg=Avg('percentage'), n=Count('id'))
+    }
+    for subject in get_taxonomy().subjects:
+        row = per_subject.get(subject.id)
+        if row:
             data['subjects'].append({
                 'name': subject.name,
-                'average': round(avg_score, 1),
-                'attempts': subject_attempts.count()
+                'average': round(row['avg'] or 0, 1),
+                'attempts': row['n']
             })
     
-    return JsonResponse(data)
+    return add_validators(JsonResponse(data), etag)
 
 @login_required
 def activity_data(request):
@@ -123,7 +139,7 @@ def recommendations(request):
             weak_subjects.append(data['subject'])
     
     # Recommend articles and tests for weak subjects
-    recommended_articles = Article.objects.filter(
+    recommended_articles = Article.objects.cards().filter(
         topic__subject__in=weak_subjects,
         is_published=True
     )[:10]
@@ -74,6 +74,10 @@ python manage.py check --deploy
 echo "📊 Loading sample data..."
 python load_sample_data.py || echo "⚠️ Sample data loading failed, continuing..."
 
+# Precompute related articles
+echo "🔗 Computing related articles..."
+python manage.py build_related_articles || echo "⚠️ Related articles computation failed, continuing..."
+
 # Final verification
 echo "🔍 Final database verification..."
 python -c "
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 import dj_database_url
 
@@ -167,6 +168,44 @@ LOGOUT_REDIRECT_URL = '/'
 SESSION_COOKIE_AGE = 86400  # 1 day
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Cache: file-based by default so every gunicorn worker on the host shares
+# cached pages and invalidation stamps without an external service.
+# Set CACHE_BACKEND=locmem to keep the cache inside a single process.
+# The 'autosave' alias holds unflushed test answers (tests.autosave). It is
+# kept apart from page-cache keys and sized so that it never culls; buffers
+# are deleted when their attempt is graded.
+AUTOSAVE_CACHE_MAX_ENTRIES = 10 ** 6
+if os.environ.get('CACHE_BACKEND') == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gate-prep',
+        },
+        'autosave': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gate-prep-autosave',
+            'OPTIONS': {'MAX_ENTRIES': AUTOSAVE_CACHE_MAX_ENTRIES},
+        },
+    }
+else:
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'gate_prep_cache'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'autosave': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'autosave'),
+            'OPTIONS': {'MAX_ENTRIES': AUTOSAVE_CACHE_MAX_ENTRIES},
+        },
+    }
+
+# Anonymous page cache lifetime in seconds (see main.page_cache)
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 600))
+
 # Production security defaults (enabled when DEBUG is False)
 if not DEBUG:
     # Use a sensible HSTS value in production behind HTTPS reverse proxies
@@ -223,4 +262,26 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 # WhiteNoise configuration
 WHITENOISE_USE_FINDERS = True
 WHITENOISE_AUTOREFRESH = True
-WHITENOISE_SKIP_COMPRESS_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'zip', 'gz', 'tgz', 'bz2', 'tbz', 'xz', 'br']
\ No newline at end of file
+WHITENOISE_SKIP_COMPRESS_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'zip', 'gz', 'tgz', 'bz2', 'tbz', 'xz', 'br']
+
+# Article view counts are buffered per process and flushed in batches
+ARTICLE_VIEW_FLUSH_THRESHOLD = int(os.environ.get('ARTICLE_VIEW_FLUSH_THRESHOLD', 100))
+ARTICLE_VIEW_FLUSH_INTERVAL = int(os.environ.get('ARTICLE_VIEW_FLUSH_INTERVAL', 30))
+
+# Threads in the in-process background worker (main.background)
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 2))
+
+# Sparse TF-IDF corpus kept between related-article updates (main.related)
+RELATED_CORPUS_PATH = os.environ.get('RELATED_CORPUS_PATH', os.path.join(tempfile.gettempdir(), 'gate_prep_related.npz'))
+
+# Autosaved test answers are buffered in the cache and written at most this often (seconds)
+TEST_AUTOSAVE_FLUSH_INTERVAL = int(os.environ.get('TEST_AUTOSAVE_FLUSH_INTERVAL', 60))
+
+# Rendered PDF reports (tests.reports); private, so kept outside MEDIA_ROOT
+REPORT_ROOT = os.environ.get('REPORT_ROOT', os.path.join(tempfile.gettempdir(), 'gate_prep_reports'))
+
+# Worker processes shared by class-wide result exports (tests.class_export); defaults to the CPU count, at most 4
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 0)) or None
+
+# Submissions and autosaves are still accepted this long after an attempt's deadline (tests.deadlines)
+TEST_SUBMIT_GRACE_SECONDS = int(os.environ.get('TEST_SUBMIT_GRACE_SECONDS', 30))
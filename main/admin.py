@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Subject, Topic, Article, Bookmark, Note
+from .models import Subject, Topic, Article, RelatedArticle, Bookmark, Note
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -11,6 +11,7 @@ class TopicAdmin(admin.ModelAdmin):
     list_display = ('name', 'subject', 'created_at')
     list_filter = ('subject',)
     search_fields = ('name', 'subject__name')
+    list_select_related = ('subject',)
 
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
@@ -19,6 +20,18 @@ class ArticleAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ('views', 'created_at', 'updated_at')
+    show_full_result_count = False
+    list_select_related = ('topic__subject',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'topic':
+            kwargs['queryset'] = Topic.objects.select_related('subject')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+@admin.register(RelatedArticle)
+class RelatedArticleAdmin(admin.ModelAdmin):
+    list_display = ('article', 'related', 'score')
+    search_fields = ('article__title', 'related__title')
 
 @admin.register(Bookmark)
 class BookmarkAdmin(admin.ModelAdmin):
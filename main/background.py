@@ -0,0 +1,32 @@
+"""Minimal in-process background worker.
+
+Jobs are handed to a shared thread pool once the surrounding transaction
+commits, so the request that triggered them returns without waiting. Each job
+runs with its own database connection, closed when the job finishes.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+    thread_name_prefix='background',
+)
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background job %s failed', getattr(func, '__name__', func))
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` in the background after the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run, func, args, kwargs))
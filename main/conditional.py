@@ -0,0 +1,65 @@
+"""Conditional GET support (ETag / Last-Modified).
+
+Views compute a cheap validator first, call :func:`not_modified` and return
+its 304 straight away when the client's copy is still current; otherwise they
+do the real work and stamp the response with :func:`add_validators`.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from . import page_cache
+
+
+def make_etag(*parts):
+    """Weak ETag over ``parts``; weak because counters like views may lag."""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return 'W/' + quote_etag(digest)
+
+
+def add_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Let browsers keep the body but revalidate it on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """Return a 304 response if the client's cached copy is current, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        add_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_page(*model_names):
+    """ETag a page on the page-cache generation stamps of the models it renders.
+
+    The 304 is answered before the view (and any page cache under it) runs.
+    Usage:
+        @conditional_page('mocktest', 'question', 'subject')
+        def test_list(request):
+            ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            etag = make_etag(
+                request.get_full_path(), request.user.pk, *page_cache.generations(model_names)
+            )
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                add_validators(response, etag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,117 @@
+"""Compile article Markdown into the fields the detail page renders.
+
+``Article.save()`` runs :func:`compile_content` whenever the body changes, so
+requests only emit the stored HTML, table of contents, word count and
+reading time instead of re-processing the body every time.
+
+The stored HTML is printed unescaped, so raw HTML in the body is escaped
+and the generated tree is cut down to an allowlist of tags, attributes and
+URL schemes before it is serialised.
+"""
+import math
+import re
+from html import unescape
+
+import markdown
+from markdown.treeprocessors import Treeprocessor
+
+WORDS_PER_MINUTE = 200
+
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'toc']
+MARKDOWN_EXTENSION_CONFIGS = {
+    'toc': {'toc_depth': '2-3'},
+}
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'blockquote', 'br', 'code', 'dd', 'del', 'div', 'dl', 'dt', 'em', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'hr', 'img', 'ins', 'li', 'ol', 'p', 'pre', 'span', 'strong', 'sub', 'sup', 'table',
+    'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    '*': {'id', 'class', 'title'},
+    'a': {'href', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'style', 'align'},
+    'th': {'style', 'align'},
+    'ol': {'start'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto'}
+
+_SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+# Browsers ignore whitespace and control characters inside a URL scheme
+_URL_IGNORED_RE = re.compile(r'[\x00-\x20\x7f]+')
+# The only inline style Markdown emits (table column alignment)
+_ALIGN_STYLE_RE = re.compile(r'^text-align:\s*(left|right|center);?$')
+
+# A list item directly under a paragraph line needs a blank line in Markdown
+_LIST_ITEM_RE = re.compile(r'^\s*(?:[-*+]|\d+\.)\s+')
+
+
+def reading_time_for(word_count):
+    """Minutes needed to read ``word_count`` words, never less than one."""
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+
+
+def _separate_lists(text):
+    lines = []
+    in_fence = False
+    for line in text.splitlines():
+        if line.lstrip().startswith(('```', '~~~')):
+            in_fence = not in_fence
+        elif (not in_fence and _LIST_ITEM_RE.match(line) and lines and lines[-1].strip()
+                and not _LIST_ITEM_RE.match(lines[-1])):
+            lines.append('')
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def is_safe_url(url):
+    """True for relative URLs and http, https or mailto ones."""
+    # Markdown keeps character references in URLs, and the browser decodes them
+    match = _SCHEME_RE.match(_URL_IGNORED_RE.sub('', unescape(url)).lower())
+    return match is None or match.group(1) in ALLOWED_SCHEMES
+
+
+class _SanitizeTreeprocessor(Treeprocessor):
+    """Drop tags, attributes and URLs outside the allowlists; runs after every other treeprocessor."""
+
+    def run(self, root):
+        for element in root.iter():
+            if element is root:
+                continue
+            if element.tag not in ALLOWED_TAGS:
+                # Keep the text, lose the element's meaning
+                element.tag = 'span'
+                element.attrib.clear()
+                continue
+            allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(element.tag, set())
+            for name, value in list(element.attrib.items()):
+                if (name not in allowed
+                        or (name in URL_ATTRIBUTES and not is_safe_url(value))
+                        or (name == 'style' and not _ALIGN_STYLE_RE.match(value.strip()))):
+                    del element.attrib[name]
+
+
+def _renderer():
+    md = markdown.Markdown(
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+        output_format='html',
+    )
+    # Escape raw HTML instead of passing it through to the page
+    md.preprocessors.deregister('html_block')
+    md.inlinePatterns.deregister('html')
+    # Lowest priority, so after inline links, attr_list and unescaping
+    md.treeprocessors.register(_SanitizeTreeprocessor(md), 'sanitize', -1)
+    return md
+
+
+def compile_content(content):
+    """Return ``(html, toc_html, word_count, reading_time)`` for an article body."""
+    content = content or ''
+    md = _renderer()
+    html = md.convert(_separate_lists(content))
+    toc_html = md.toc if md.toc_tokens else ''
+    word_count = len(content.split())
+    return html, toc_html, word_count, reading_time_for(word_count)
@@ -9,3 +9,7 @@ class ArticleCreateForm(forms.ModelForm):
             'content': forms.Textarea(attrs={'rows': 8, 'class': 'form-control'}),
             'excerpt': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['topic'].queryset = Topic.objects.select_related('subject')
@@ -0,0 +1,115 @@
+"""Responsive derivatives for uploaded images.
+
+After an upload, :func:`schedule_variants` queues :func:`generate_variants` on
+the background worker. It writes resized WebP and JPEG copies next to the
+original (``articles/pit.jpg`` -> ``articles/pit__card.webp``) and records them
+in the model's ``*_variants`` JSON field, which the ``responsive_image``
+template tag turns into ``srcset`` attributes, then bumps the model's page-cache
+generation so anonymous pages pick them up.
+"""
+import io
+import logging
+import posixpath
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from . import background, page_cache
+
+logger = logging.getLogger(__name__)
+
+# Derivative name -> maximum width in pixels; images are never upscaled
+VARIANT_WIDTHS = (
+    ('thumb', 160),
+    ('card', 480),
+    ('full', 1280),
+)
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def variants_current(image, variants):
+    """True if ``variants`` were generated from the file currently in ``image``."""
+    return bool(image) and (variants or {}).get('source') == image.name
+
+
+def schedule_variants(instance, image_field, variants_field):
+    """Queue derivative generation if ``instance``'s image has no up-to-date variants."""
+    image = getattr(instance, image_field)
+    if not image or variants_current(image, getattr(instance, variants_field)):
+        return
+    background.submit(
+        generate_variants, instance._meta.label, instance.pk, image_field, variants_field, image.name
+    )
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(model_label, pk, image_field, variants_field, source_name):
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('pk', image_field, variants_field).first()
+    if instance is None:
+        return
+    image_file = getattr(instance, image_field)
+    if image_file.name != source_name:
+        # Replaced again since this job was queued; the newer job handles it
+        return
+
+    storage = image_file.storage
+    with storage.open(source_name, 'rb') as handle:
+        original = ImageOps.exif_transpose(Image.open(handle))
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        # Flatten transparency onto white for JPEG
+        background_layer = Image.new('RGB', original.size, (255, 255, 255))
+        background_layer.paste(original.convert('RGBA'), mask=original.convert('RGBA').split()[-1])
+        original = background_layer
+    original = original.convert('RGB')
+
+    root, _ = posixpath.splitext(source_name)
+    variants = {'source': source_name, 'sizes': []}
+    previous = getattr(instance, variants_field) or {}
+
+    for name, max_width in VARIANT_WIDTHS:
+        if variants['sizes'] and original.width <= variants['sizes'][-1]['width']:
+            # Source is already smaller than the previous step; nothing larger to add
+            break
+        resized = original
+        if original.width > max_width:
+            height = round(original.height * max_width / original.width)
+            resized = original.resize((max_width, height), Image.LANCZOS)
+
+        entry = {'name': name, 'width': resized.width, 'height': resized.height}
+        for key, fmt, extension, options in (
+            ('webp', 'WEBP', 'webp', {'quality': WEBP_QUALITY, 'method': 6}),
+            ('jpeg', 'JPEG', 'jpg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+        ):
+            path = f'{root}__{name}.{extension}'
+            if storage.exists(path):
+                storage.delete(path)
+            entry[key] = storage.save(path, _encode(resized, fmt, **options))
+        variants['sizes'].append(entry)
+
+    updated = model.objects.filter(pk=pk, **{image_field: source_name}).update(**{variants_field: variants})
+    if updated:
+        # Queryset updates send no post_save, so drop the cached pages rendered without srcset here
+        page_cache.bump_generation(model._meta.model_name)
+        _delete_stale(storage, previous, variants)
+
+
+def _delete_stale(storage, previous, current):
+    keep = {entry[key] for entry in current['sizes'] for key in ('webp', 'jpeg')}
+    for entry in previous.get('sizes', []):
+        for key in ('webp', 'jpeg'):
+            path = entry.get(key)
+            if path and path not in keep:
+                try:
+                    storage.delete(path)
+                except OSError:
+                    logger.warning('Could not delete stale image derivative %s', path)
@@ -0,0 +1,42 @@
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from main.models import Article
+
+
+def _fetch_stats(queryset):
+    """Bytes of column data returned by the database and peak Python memory to build the models."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        payload = sum(
+            len(value.encode()) if isinstance(value, str) else len(str(value))
+            for row in cursor.fetchall() for value in row if value is not None
+        )
+
+    tracemalloc.start()
+    rows = list(queryset)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), payload, peak
+
+
+class Command(BaseCommand):
+    help = 'Compare full-row and card querysets for article list pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[9, 25, 50])
+
+    def handle(self, *args, **options):
+        base = Article.objects.filter(is_published=True)
+        self.stdout.write(f"{'page':>6} {'full bytes':>12} {'card bytes':>12} {'full mem':>10} {'card mem':>10}")
+        for size in options['sizes']:
+            full_rows, full_bytes, full_mem = _fetch_stats(
+                base.select_related('topic__subject', 'author')[:size]
+            )
+            _, card_bytes, card_mem = _fetch_stats(Article.objects.cards().filter(is_published=True)[:size])
+            self.stdout.write(
+                f'{full_rows:>6} {full_bytes:>12,} {card_bytes:>12,} {full_mem:>10,} {card_mem:>10,}'
+            )
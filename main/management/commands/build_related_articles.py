@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main import related
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related-articles lists of all published articles'
+
+    def handle(self, *args, **options):
+        count = related.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Computed related articles for {count} articles'))
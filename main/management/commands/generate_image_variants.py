@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import UserProfile
+from main import images
+from main.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Generate missing responsive derivatives for article and profile images'
+
+    def handle(self, *args, **options):
+        count = 0
+        for model, image_field, variants_field in (
+            (Article, 'featured_image', 'featured_image_variants'),
+            (UserProfile, 'profile_picture', 'profile_picture_variants'),
+        ):
+            queryset = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+            for instance in queryset.only('pk', image_field, variants_field).iterator():
+                image = getattr(instance, image_field)
+                if images.variants_current(image, getattr(instance, variants_field)):
+                    continue
+                images.generate_variants(model._meta.label, instance.pk, image_field, variants_field, image.name)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {count} images'))
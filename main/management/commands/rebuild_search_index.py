@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from main import search
+from main.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all articles'
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {Article.objects.count()} articles'))
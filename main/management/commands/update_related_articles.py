@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main import related
+
+
+class Command(BaseCommand):
+    help = 'Refresh the related-articles lists touched by article changes; schedule it every minute or so'
+
+    def handle(self, *args, **options):
+        count = related.update()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed related articles for {count} articles'))
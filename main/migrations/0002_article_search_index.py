@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS main_article_fts "
+    "USING fts5(title, excerpt, content, tokenize='porter unicode61')",
+    "INSERT INTO main_article_fts (rowid, title, excerpt, content) "
+    "SELECT id, title, excerpt, content FROM main_article",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS main_article_fts",
+]
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE main_article ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS main_article_search_vector_gin "
+    "ON main_article USING GIN (search_vector)",
+    "UPDATE main_article SET search_vector = "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS main_article_search_vector_gin",
+    "ALTER TABLE main_article DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, sqlite_statements, postgres_statements):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # main.search falls back to icontains when the table is missing
+                return
+        statements = sqlite_statements
+    elif vendor == 'postgresql':
+        statements = postgres_statements
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, SQLITE_FORWARD, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, SQLITE_BACKWARD, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
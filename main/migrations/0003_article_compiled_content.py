@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:58
+
+from django.db import migrations, models
+
+from main.content import compile_content
+
+
+def compile_existing_articles(apps, schema_editor):
+    Article = apps.get_model('main', 'Article')
+    articles = list(Article.objects.only('id', 'content'))
+    for article in articles:
+        article.content_html, article.toc_html, article.word_count, article.reading_time = compile_content(article.content)
+    Article.objects.bulk_update(
+        articles, ['content_html', 'toc_html', 'word_count', 'reading_time'], batch_size=200
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_article_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='toc_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compile_existing_articles, migrations.RunPython.noop),
+    ]
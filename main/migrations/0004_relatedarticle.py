@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_article_compiled_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='main.article')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.article')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['article', '-score'], name='main_relate_article_e5fdc5_idx')],
+                'unique_together': {('article', 'related')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_relatedarticle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from main.content import compile_content
+
+
+def recompile_articles(apps, schema_editor):
+    """Re-render every stored body through the sanitising renderer."""
+    Article = apps.get_model('main', 'Article')
+    articles = list(Article.objects.only('id', 'content'))
+    for article in articles:
+        article.content_html, article.toc_html, article.word_count, article.reading_time = compile_content(article.content)
+    Article.objects.bulk_update(
+        articles, ['content_html', 'toc_html', 'word_count', 'reading_time'], batch_size=200
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_article_featured_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompile_articles, migrations.RunPython.noop),
+    ]
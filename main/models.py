@@ -1,7 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
+from . import images, page_cache, search, suggest, user_state
+from .content import compile_content
+
 class Subject(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -17,8 +22,17 @@ class Topic(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
+        # Choice lists render every topic; load them with select_related('subject')
         return f"{self.subject.name} - {self.name}"
 
+class ArticleQuerySet(models.QuerySet):
+    # Large text columns that list cards never display
+    BODY_FIELDS = ('content', 'content_html', 'toc_html')
+
+    def cards(self):
+        """Articles for list/card display: bodies deferred, taxonomy and author joined."""
+        return self.select_related('topic__subject', 'author').defer(*self.BODY_FIELDS)
+
 class Article(models.Model):
     DIFFICULTY_CHOICES = [
         ('easy', 'Easy'),
@@ -34,10 +48,19 @@ class Article(models.Model):
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='medium')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     featured_image = models.ImageField(upload_to='articles/', blank=True, null=True)
+    # Resized WebP/JPEG copies written by main.images in the background
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     views = models.PositiveIntegerField(default=0)
+    # Compiled from `content` on save by main.content.compile_content
+    content_html = models.TextField(blank=True, editable=False)
+    toc_html = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
@@ -45,6 +68,35 @@ class Article(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.compile_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'content_html', 'toc_html', 'word_count', 'reading_time'
+                }
+        super().save(*args, **kwargs)
+
+    def compile_content(self):
+        self.content_html, self.toc_html, self.word_count, self.reading_time = compile_content(self.content)
+
+class RelatedArticle(models.Model):
+    """Precomputed nearest neighbours of an article, maintained by main.related."""
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        unique_together = ('article', 'related')
+        indexes = [
+            models.Index(fields=['article', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.article.title} -> {self.related.title} ({self.score:.2f})"
+
 class Bookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
@@ -64,4 +116,38 @@ class Note(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Note by {self.user.username} on {self.article.title}"
\ No newline at end of file
+        return f"Note by {self.user.username} on {self.article.title}"
+
+@receiver(post_save, sender=Article)
+def index_article(sender, instance, **kwargs):
+    search.index_article(instance)
+    suggest.invalidate()
+    images.schedule_variants(instance, 'featured_image', 'featured_image_variants')
+
+@receiver(post_delete, sender=Article)
+def unindex_article(sender, instance, **kwargs):
+    search.unindex_article(instance.pk)
+    suggest.invalidate()
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_taxonomy_suggestions(sender, **kwargs):
+    suggest.invalidate()
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_cached_pages(sender, **kwargs):
+    page_cache.bump_generation(sender._meta.model_name)
+
+@receiver(post_save, sender=Bookmark)
+@receiver(post_delete, sender=Bookmark)
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def invalidate_article_state(sender, instance, **kwargs):
+    user_state.invalidate(instance.user_id)
@@ -0,0 +1,82 @@
+"""Whole-page cache for anonymous visitors.
+
+Cached pages are keyed by URL, query string and the current generation stamp
+of every model the page depends on. A ``post_save``/``post_delete`` on one of
+those models (see the receivers in ``main/models.py`` and ``tests/models.py``)
+moves its stamp forward, so only the pages built from that model miss the
+cache afterwards.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+
+GENERATION_KEY = 'page:generation:{}'
+
+
+def bump_generation(model_name):
+    """Invalidate every cached page that depends on ``model_name``."""
+    cache.set(GENERATION_KEY.format(model_name), time.time_ns(), None)
+
+
+def generations(model_names):
+    """Current generation stamps of ``model_names``, in order."""
+    keys = [GENERATION_KEY.format(name) for name in model_names]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # A fresh stamp can never match a page cached under an evicted one
+            cache.add(key, time.time_ns(), None)
+            stamps[key] = cache.get(key)
+    return [stamps[key] for key in keys]
+
+
+def _page_key(request, model_names):
+    query = '&'.join(sorted(
+        f'{key}={value}' for key, values in request.GET.lists() for value in values
+    ))
+    stamps = '.'.join(str(stamp) for stamp in generations(model_names))
+    raw = f'{request.path}?{query}|{stamps}'
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Pending flash messages are rendered into the page and must not be shared
+    if request.COOKIES.get('messages'):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and '_messages' in request.session:
+        return False
+    return True
+
+
+def cache_anonymous_page(*model_names, timeout=None):
+    """Cache a view's response for anonymous users until one of ``model_names`` changes.
+
+    Usage:
+        @cache_anonymous_page('article', 'subject', 'topic')
+        def article_list(request):
+            ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = _page_key(request, model_names)
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, response, PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+            return response
+        return wrapper
+    return decorator
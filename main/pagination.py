@@ -0,0 +1,114 @@
+"""Keyset (cursor) pagination for long lists.
+
+Unlike ``django.core.paginator.Paginator`` this never issues ``COUNT(*)`` or
+``OFFSET``: each page seeks past the last row of the previous one using the
+list's ordering key, so deep pages cost the same as the first. Pages are
+addressed by opaque ``next_cursor``/``previous_cursor`` tokens.
+
+The ordering must be a total order over non-null fields of the model, e.g.
+``('-created_at', '-id')``.
+"""
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder drops microseconds, which breaks the seek
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.has_next = next_cursor is not None
+        self.has_previous = previous_cursor is not None
+        self.has_other_pages = self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class CursorPaginator:
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def get_page(self, cursor=None):
+        """Return the page addressed by ``cursor``; invalid or missing cursors give the first page."""
+        direction, key = self._decode(cursor)
+        backwards = direction == PREVIOUS
+
+        queryset = self.queryset
+        if key is not None:
+            queryset = queryset.filter(self._seek(key, backwards))
+        ordering = [
+            f'-{name}' if descending != backwards else name
+            for name, descending in zip(self.fields, self.descending)
+        ]
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows)
+
+        has_next = key is not None if backwards else has_more
+        has_previous = has_more if backwards else key is not None
+        return CursorPage(
+            rows,
+            next_cursor=self._encode(NEXT, rows[-1]) if has_next else None,
+            previous_cursor=self._encode(PREVIOUS, rows[0]) if has_previous else None,
+        )
+
+    def _seek(self, key, backwards):
+        # Lexicographic "comes after key": (a < x) | (a == x & b < y) | ...
+        clauses = []
+        for index, (name, descending) in enumerate(zip(self.fields, self.descending)):
+            lookup = 'lt' if descending != backwards else 'gt'
+            conditions = dict(zip(self.fields[:index], key[:index]))
+            conditions[f'{name}__{lookup}'] = key[index]
+            clauses.append(Q(**conditions))
+        return reduce(or_, clauses)
+
+    def _encode(self, direction, obj):
+        values = [getattr(obj, name) for name in self.fields]
+        payload = json.dumps([direction, values], default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        if not cursor:
+            return NEXT, None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in (NEXT, PREVIOUS) or len(values) != len(self.fields):
+                raise ValueError(cursor)
+            opts = self.queryset.model._meta
+            key = [opts.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return NEXT, None
+        return direction, key
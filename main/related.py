@@ -0,0 +1,345 @@
+"""Content-similarity engine behind the "Related Articles" panel.
+
+Published articles are turned into TF-IDF vectors over their title, excerpt
+and content, and each article's top ``RELATED_ARTICLES_K`` cosine neighbours
+are stored in ``RelatedArticle``. :func:`rebuild_all` recomputes every list in
+one vectorised pass.
+
+Web processes never build the corpus. ``manage.py update_related_articles``
+(schedule it every minute or so) calls :func:`update`, which reads the corpus
+saved by the previous run from ``RELATED_CORPUS_PATH``, compares its
+``updated_at`` stamps with the database, vectorises just the changed articles
+against the stored IDF weights, and rewrites only the lists the changes
+affect. Rows are stored sparsely (CSR arrays) and densified a block at a time
+while scoring. The vocabulary and IDF are rebuilt from scratch once the saved
+corpus is ``MAX_CORPUS_AGE`` seconds old, and by ``rebuild_all``.
+"""
+import math
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+RELATED_ARTICLES_K = 5
+
+# Vocabulary is capped to the most widespread terms to bound matrix width
+MAX_FEATURES = 4096
+
+# Rows of the similarity matrix computed at once
+CHUNK_SIZE = 256
+
+# Corpus rows densified at once while scoring a chunk
+BLOCK_SIZE = 1024
+
+# The saved corpus is rebuilt after this many seconds, refreshing the vocabulary and IDF
+MAX_CORPUS_AGE = 6 * 3600
+
+TITLE_WEIGHT = 3
+EXCERPT_WEIGHT = 2
+
+STOP_WORDS = frozenset("""
+    a an and are as at be by can for from has have in into is it its of on or
+    that the their this to was were which with will these those such than then
+    also used using use may more most other over under between about each
+""".split())
+
+_TOKEN_RE = re.compile(r'[^\W\d_]{2,}', re.UNICODE)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall((text or '').lower()) if token not in STOP_WORDS]
+
+
+def _document(title, excerpt, content):
+    return (
+        tokenize(title) * TITLE_WEIGHT +
+        tokenize(excerpt) * EXCERPT_WEIGHT +
+        tokenize(content)
+    )
+
+
+def _stamp(updated_at):
+    return updated_at.isoformat()
+
+
+class Corpus:
+    """Sparse TF-IDF matrix of published articles, one L2-normalised row each.
+
+    Row ``i`` holds ``data[indptr[i]:indptr[i + 1]]`` at the columns
+    ``indices[indptr[i]:indptr[i + 1]]``. The vocabulary and IDF weights are
+    fixed when the corpus is built; rows added or replaced later are
+    vectorised against them.
+    """
+
+    def __init__(self, ids, stamps, vocabulary, idf, indptr, indices, data, built_at):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.position = {int(article_id): index for index, article_id in enumerate(self.ids)}
+        self.stamps = dict(zip(self.position, stamps))
+        self.vocabulary = list(vocabulary)
+        self.column = {term: index for index, term in enumerate(self.vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.built_at = float(built_at)
+
+    @classmethod
+    def build(cls, ids, stamps, documents):
+        n = len(documents)
+        counts = [Counter(tokens) for tokens in documents]
+        df = Counter()
+        for counter in counts:
+            df.update(counter.keys())
+        vocabulary = sorted(df, key=lambda term: (-df[term], term))[:MAX_FEATURES]
+        idf = [math.log((1 + n) / (1 + df[term])) + 1.0 for term in vocabulary]
+        corpus = cls(ids, stamps, vocabulary, idf, [0], [], [], time.time())
+        corpus._assemble(corpus._vectorize(counts))
+        return corpus
+
+    @classmethod
+    def load(cls):
+        from .models import Article
+
+        rows = Article.objects.filter(is_published=True).order_by('id').values_list(
+            'id', 'updated_at', 'title', 'excerpt', 'content'
+        )
+        ids, stamps, documents = [], [], []
+        for article_id, updated_at, title, excerpt, content in rows.iterator(chunk_size=500):
+            ids.append(article_id)
+            stamps.append(_stamp(updated_at))
+            documents.append(_document(title, excerpt, content))
+        return cls.build(ids, stamps, documents)
+
+    @classmethod
+    def read(cls, path):
+        """The corpus saved at ``path``, or ``None`` if there is none."""
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                return cls(
+                    saved['ids'], saved['stamps'].tolist(), saved['vocabulary'].tolist(), saved['idf'],
+                    saved['indptr'], saved['indices'], saved['data'], saved['built_at'],
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        partial = f'{path}.{os.getpid()}.tmp'
+        with open(partial, 'wb') as handle:
+            np.savez(
+                handle,
+                ids=self.ids,
+                stamps=np.array([self.stamps[int(article_id)] for article_id in self.ids], dtype=str),
+                vocabulary=np.array(self.vocabulary, dtype=str),
+                idf=self.idf,
+                indptr=self.indptr,
+                indices=self.indices,
+                data=self.data,
+                built_at=np.float64(self.built_at),
+            )
+        os.replace(partial, path)
+
+    def _vectorize(self, counts):
+        """``(indices, data)`` of each counter's normalised row."""
+        rows = []
+        for counter in counts:
+            pairs = sorted(
+                (self.column[term], count) for term, count in counter.items() if term in self.column
+            )
+            indices = np.array([index for index, _ in pairs], dtype=np.int32)
+            # Sublinear term frequency damps long articles repeating a word
+            data = (1.0 + np.log(np.array([count for _, count in pairs], dtype=np.float32))) * self.idf[indices]
+            norm = np.linalg.norm(data)
+            if norm > 0:
+                data /= norm
+            rows.append((indices, data.astype(np.float32)))
+        return rows
+
+    def _rows(self):
+        return [
+            (self.indices[start:end], self.data[start:end])
+            for start, end in zip(self.indptr[:-1], self.indptr[1:])
+        ]
+
+    def _assemble(self, rows):
+        lengths = [len(indices) for indices, _ in rows]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)
+        self.indices = np.concatenate([np.zeros(0, np.int32)] + [indices for indices, _ in rows]).astype(np.int32)
+        self.data = np.concatenate([np.zeros(0, np.float32)] + [data for _, data in rows]).astype(np.float32)
+
+    def upsert(self, articles):
+        """Vectorise ``(article_id, stamp, tokens)`` triples into new or existing rows."""
+        if not articles:
+            return
+        vectors = self._vectorize([Counter(tokens) for _, _, tokens in articles])
+        rows = self._rows()
+        added = []
+        for (article_id, stamp, _), vector in zip(articles, vectors):
+            self.stamps[article_id] = stamp
+            position = self.position.get(article_id)
+            if position is None:
+                added.append(article_id)
+                rows.append(vector)
+            else:
+                rows[position] = vector
+        self._assemble(rows)
+        if added:
+            self.ids = np.concatenate([self.ids, np.array(added, dtype=np.int64)])
+            self.position = {int(article_id): index for index, article_id in enumerate(self.ids)}
+
+    def remove(self, article_ids):
+        positions = {self.position[article_id] for article_id in article_ids if article_id in self.position}
+        if not positions:
+            return
+        for article_id in article_ids:
+            self.stamps.pop(article_id, None)
+        self._assemble([row for index, row in enumerate(self._rows()) if index not in positions])
+        self.ids = np.delete(self.ids, sorted(positions))
+        self.position = {int(article_id): index for index, article_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _dense(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        block = np.zeros((len(positions), len(self.vocabulary)), dtype=np.float32)
+        starts, ends = self.indptr[positions], self.indptr[positions + 1]
+        if len(positions):
+            take = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+            block[np.repeat(np.arange(len(positions)), ends - starts), self.indices[take]] = self.data[take]
+        return block
+
+    def similarity(self, positions):
+        """Cosine similarity of every row with the given rows, shaped ``(len(self), len(positions))``."""
+        query = self._dense(positions).T
+        scores = np.empty((len(self), query.shape[1]), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, len(self))
+            scores[start:end] = self._dense(np.arange(start, end)) @ query
+        return scores
+
+    def neighbours(self, positions, k=RELATED_ARTICLES_K):
+        """Yield ``(article_id, [(related_id, score), ...])`` for the given row positions."""
+        positions = np.asarray(positions, dtype=np.int64)
+        for start in range(0, len(positions), CHUNK_SIZE):
+            chunk = positions[start:start + CHUNK_SIZE]
+            scores = self.similarity(chunk).T
+            scores[np.arange(len(chunk)), chunk] = -1.0
+            top = min(k, len(self) - 1)
+            if top <= 0:
+                for position in chunk:
+                    yield int(self.ids[position]), []
+                continue
+            best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            for row, position in enumerate(chunk):
+                candidates = best[row][np.argsort(-scores[row, best[row]])]
+                yield int(self.ids[position]), [
+                    (int(self.ids[column]), float(scores[row, column]))
+                    for column in candidates
+                    if scores[row, column] > 0
+                ]
+
+
+def _write(results):
+    from .models import RelatedArticle
+
+    results = list(results)
+    links = [
+        RelatedArticle(article_id=article_id, related_id=related_id, score=score)
+        for article_id, neighbours in results
+        for related_id, score in neighbours
+    ]
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=[article_id for article_id, _ in results]).delete()
+        RelatedArticle.objects.bulk_create(links, batch_size=500)
+
+
+def _sync(corpus):
+    """Apply article changes since the corpus was saved; returns ``(changed_ids, removed_ids)``.
+
+    Only ids and ``updated_at`` stamps are read for the whole table; title,
+    excerpt and content are fetched for the changed articles alone.
+    """
+    from .models import Article
+
+    current = {
+        article_id: _stamp(updated_at)
+        for article_id, updated_at in Article.objects.filter(is_published=True).values_list('id', 'updated_at').iterator()
+    }
+    removed = [article_id for article_id in corpus.stamps if article_id not in current]
+    changed = [article_id for article_id, stamp in current.items() if corpus.stamps.get(article_id) != stamp]
+    corpus.remove(removed)
+    corpus.upsert([
+        (article_id, _stamp(updated_at), _document(title, excerpt, content))
+        for article_id, updated_at, title, excerpt, content in Article.objects.filter(pk__in=changed)
+        .values_list('id', 'updated_at', 'title', 'excerpt', 'content').iterator()
+    ])
+    return changed, removed
+
+
+def rebuild_all():
+    """Recompute the related lists of every published article and save a fresh corpus."""
+    from .models import RelatedArticle
+
+    corpus = Corpus.load()
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        _write(corpus.neighbours(range(len(corpus))))
+    corpus.save(settings.RELATED_CORPUS_PATH)
+    return len(corpus)
+
+
+def update():
+    """Refresh the lists touched by articles changed since the last update or rebuild.
+
+    That is each changed article's own list, lists that currently include a
+    changed or removed article, and lists that are short or whose weakest
+    entry a changed article now outscores. Without a saved corpus, or once it
+    is ``MAX_CORPUS_AGE`` old, this is a :func:`rebuild_all`. Returns how
+    many lists were rewritten.
+    """
+    from .models import RelatedArticle
+
+    corpus = Corpus.read(settings.RELATED_CORPUS_PATH)
+    if corpus is None or time.time() - corpus.built_at >= MAX_CORPUS_AGE:
+        return rebuild_all()
+    changed, removed = _sync(corpus)
+    if not changed and not removed:
+        return 0
+
+    size = np.zeros(len(corpus), dtype=np.int64)
+    weakest = np.zeros(len(corpus), dtype=np.float32)
+    for row in RelatedArticle.objects.values('article_id').annotate(size=Count('id'), weakest=Min('score')):
+        position = corpus.position.get(row['article_id'])
+        if position is not None:
+            size[position], weakest[position] = row['size'], row['weakest']
+
+    affected = {
+        corpus.position[owner_id]
+        for owner_id in RelatedArticle.objects.filter(related_id__in=changed + removed)
+        .values_list('article_id', flat=True)
+        if owner_id in corpus.position
+    }
+    if removed:
+        # Unpublished or deleted: refill the lists that lost them to a cascade
+        affected.update(np.flatnonzero(size < RELATED_ARTICLES_K).tolist())
+
+    positions = [corpus.position[article_id] for article_id in changed]
+    if positions:
+        affected.update(positions)
+        scores = corpus.similarity(positions)
+        scores[positions, np.arange(len(positions))] = 0
+        best = scores.max(axis=1)
+        affected.update(np.flatnonzero((best > 0) & ((size < RELATED_ARTICLES_K) | (best > weakest))).tolist())
+
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=removed).delete()
+        _write(corpus.neighbours(sorted(affected)))
+    # Saved only once the lists are written, so a failed run is retried in full
+    corpus.save(settings.RELATED_CORPUS_PATH)
+    return len(affected)
@@ -0,0 +1,150 @@
+"""Full-text search over articles.
+
+SQLite databases keep an FTS5 table (``main_article_fts``) whose rowid is the
+article id. PostgreSQL databases keep a ``search_vector`` tsvector column on
+``main_article`` behind a GIN index. Both are created by migration
+``0002_article_search_index`` and kept in sync by the Article signal handlers
+in ``main/models.py``. Other backends fall back to ``icontains`` filtering.
+"""
+import logging
+import re
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'main_article_fts'
+
+# Relative weights of title, excerpt and content in the ranking
+SQLITE_RANK = f"bm25({FTS_TABLE}, 10.0, 5.0, 1.0)"
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')"
+)
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+_index_available = None
+
+
+def search_terms(query):
+    """Split a user query into lowercase word tokens safe to embed in a match expression."""
+    return _TERM_RE.findall((query or '').lower())
+
+
+def index_available():
+    """True when the database has its full-text index; checked once per process."""
+    global _index_available
+    if _index_available is None:
+        if connection.vendor == 'sqlite':
+            sql = f"SELECT rowid FROM {FTS_TABLE} LIMIT 1"
+        elif connection.vendor == 'postgresql':
+            sql = "SELECT search_vector FROM main_article LIMIT 1"
+        else:
+            _index_available = False
+            return False
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql)
+            _index_available = True
+        except DatabaseError:
+            logger.warning('Full-text search unavailable, falling back to a table scan', exc_info=True)
+            _index_available = False
+    return _index_available
+
+
+def search_articles(queryset, query):
+    """Filter an Article queryset down to matches for ``query``, ordered by relevance.
+
+    Every term must match; the last term is treated as a prefix so results
+    follow the user while they type. The match and its rank become part of
+    the caller's query, so its filters (published, subject, bookmarks...)
+    apply before any page is cut.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if not index_available():
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(content__icontains=query) |
+            Q(excerpt__icontains=query)
+        )
+
+    if connection.vendor == 'sqlite':
+        expression = ' '.join(f'"{term}"' for term in terms[:-1])
+        expression = f'{expression} "{terms[-1]}"*'.strip()
+        match = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        return queryset.filter(pk__in=RawSQL(match, [expression])).annotate(
+            relevance=RawSQL(
+                f"SELECT {SQLITE_RANK} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = main_article.id",
+                [expression], output_field=FloatField(),
+            ),
+        ).order_by('relevance')
+
+    expression = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    return queryset.alias(
+        matched=RawSQL(
+            "main_article.search_vector @@ to_tsquery('english', %s)", [expression], output_field=BooleanField()
+        ),
+    ).filter(matched=True).annotate(
+        relevance=RawSQL(
+            "ts_rank(main_article.search_vector, to_tsquery('english', %s))", [expression], output_field=FloatField()
+        ),
+    ).order_by('-relevance')
+
+
+def index_article(article):
+    """Write the current title, excerpt and content of ``article`` into the index."""
+    if connection.vendor == 'sqlite':
+        statements = [
+            (f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article.pk]),
+            (
+                f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content) VALUES (%s, %s, %s, %s)",
+                [article.pk, article.title, article.excerpt, article.content],
+            ),
+        ]
+    elif connection.vendor == 'postgresql':
+        statements = [
+            (f"UPDATE main_article SET search_vector = {POSTGRES_VECTOR} WHERE id = %s", [article.pk]),
+        ]
+    else:
+        return
+    _execute(statements)
+
+
+def unindex_article(article_id):
+    """Drop an article from the index. PostgreSQL needs nothing: the vector lives on the row."""
+    if connection.vendor == 'sqlite':
+        _execute([(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article_id])])
+
+
+def rebuild_index():
+    """Re-index every article from scratch."""
+    if connection.vendor == 'sqlite':
+        statements = [
+            (f"DELETE FROM {FTS_TABLE}", []),
+            (
+                f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content) "
+                "SELECT id, title, excerpt, content FROM main_article",
+                [],
+            ),
+        ]
+    elif connection.vendor == 'postgresql':
+        statements = [(f"UPDATE main_article SET search_vector = {POSTGRES_VECTOR}", [])]
+    else:
+        return
+    _execute(statements)
+
+
+def _execute(statements):
+    # A savepoint keeps a missing index from breaking the caller's transaction
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute(sql, params)
+    except DatabaseError:
+        logger.warning('Could not update the article search index', exc_info=True)
@@ -0,0 +1,138 @@
+"""In-process prefix index for search-as-you-type suggestions.
+
+Every process keeps a sorted array of the normalised title, topic and subject
+tokens of published articles and answers prefix lookups with ``bisect``, so
+the suggestion box does not touch the database on each keystroke. The index
+is built on first use and rebuilt when the shared version stamp in the cache
+changes; the Article, Topic and Subject signals in ``main/models.py`` bump it.
+"""
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+
+VERSION_KEY = 'main:suggest:version'
+SUGGESTION_LIMIT = 10
+
+# Rebuild at least this often even without a bump, in case the cache is not shared
+MAX_INDEX_AGE = 300
+
+FIELD_WEIGHTS = {'title': 3, 'topic': 2, 'subject': 1}
+EXACT_MATCH_BONUS = 0.5
+
+
+def normalize(text):
+    """Lowercase, strip accents and split into word tokens."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return ''.join(ch if ch.isalnum() else ' ' for ch in text).split()
+
+
+class PrefixIndex:
+    def __init__(self, articles, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.payloads = {}
+        self.views = {}
+        weights = defaultdict(dict)
+
+        for article in articles:
+            self.payloads[article.id] = {
+                'id': article.id,
+                'title': article.title,
+                'excerpt': article.excerpt,
+                'url': f'/articles/{article.slug}/',
+                'difficulty': article.get_difficulty_display(),
+                'topic': article.topic.name,
+            }
+            self.views[article.id] = article.views
+            for field, text in (
+                ('title', article.title),
+                ('topic', article.topic.name),
+                ('subject', article.topic.subject.name),
+            ):
+                for token in normalize(text):
+                    postings = weights[token]
+                    postings[article.id] = max(postings.get(article.id, 0), FIELD_WEIGHTS[field])
+
+        self.keys = sorted(weights)
+        self.postings = [weights[key] for key in self.keys]
+
+    def _prefix_matches(self, prefix):
+        matches = {}
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and self.keys[index].startswith(prefix):
+            # A whole-word match outranks a longer word sharing the prefix
+            bonus = EXACT_MATCH_BONUS if self.keys[index] == prefix else 0
+            for article_id, weight in self.postings[index].items():
+                matches[article_id] = max(matches.get(article_id, 0), weight + bonus)
+            index += 1
+        return matches
+
+    def suggest(self, query, limit=SUGGESTION_LIMIT):
+        """Articles with a token starting with every query term, best first."""
+        terms = normalize(query)
+        if not terms:
+            return []
+
+        scores = None
+        for term in terms:
+            matches = self._prefix_matches(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    article_id: score + matches[article_id]
+                    for article_id, score in scores.items()
+                    if article_id in matches
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda article_id: (-scores[article_id], -self.views[article_id]))
+        return [self.payloads[article_id] for article_id in ranked[:limit]]
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Tell every process to rebuild its index on next use."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_index():
+    global _index
+    version = current_version()
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < MAX_INDEX_AGE:
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.built_at >= MAX_INDEX_AGE:
+            from .models import Article
+
+            articles = Article.objects.filter(is_published=True).select_related('topic__subject').only(
+                'id', 'title', 'slug', 'excerpt', 'difficulty', 'views',
+                'topic__name', 'topic__subject__name',
+            )
+            index = _index = PrefixIndex(articles, version)
+    return index
+
+
+def suggest(query, limit=SUGGESTION_LIMIT):
+    return get_index().suggest(query, limit)
@@ -0,0 +1,119 @@
+"""Per-process snapshot of the Subject/Topic taxonomy.
+
+Subjects, topics, their parent links and published article / active test
+counts are loaded once into immutable tuples and shared by every request in
+the process. The snapshot is reloaded only when the page-cache generation
+stamps of the models it is built from change (bumped by their save/delete
+signals), or after ``MAX_SNAPSHOT_AGE`` seconds in case the cache backend is
+not shared between processes.
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.db.models import Count, Q
+
+from . import page_cache
+
+SOURCE_MODELS = ('subject', 'topic', 'article', 'mocktest')
+
+MAX_SNAPSHOT_AGE = 300
+
+
+class TopicEntry(NamedTuple):
+    id: int
+    name: str
+    description: str
+    subject_id: int
+    subject_name: str
+    article_count: int
+
+    def __str__(self):
+        return f"{self.subject_name} - {self.name}"
+
+
+class SubjectEntry(NamedTuple):
+    id: int
+    name: str
+    description: str
+    created_at: object
+    topics: tuple
+    article_count: int
+    test_count: int
+
+    def __str__(self):
+        return self.name
+
+
+class Taxonomy:
+    def __init__(self, subjects, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.subjects = tuple(subjects)
+        self.subjects_by_id = MappingProxyType({subject.id: subject for subject in self.subjects})
+        self.topics_by_id = MappingProxyType({
+            topic.id: topic for subject in self.subjects for topic in subject.topics
+        })
+
+    def subject(self, subject_id):
+        return self.subjects_by_id.get(subject_id)
+
+    def topic(self, topic_id):
+        return self.topics_by_id.get(topic_id)
+
+    @classmethod
+    def load(cls, version):
+        from tests.models import MockTest
+        from .models import Subject, Topic
+
+        topic_rows = Topic.objects.order_by('id').annotate(
+            article_count=Count('articles', filter=Q(articles__is_published=True))
+        ).values_list('id', 'name', 'description', 'subject_id', 'article_count')
+        test_counts = dict(
+            MockTest.objects.filter(is_active=True).values('subject_id')
+            .annotate(count=Count('id')).values_list('subject_id', 'count')
+        )
+
+        subject_rows = list(Subject.objects.order_by('id').values_list('id', 'name', 'description', 'created_at'))
+        subject_names = {subject_id: name for subject_id, name, _, _ in subject_rows}
+
+        topics_by_subject = {}
+        for topic_id, name, description, subject_id, article_count in topic_rows:
+            topics_by_subject.setdefault(subject_id, []).append(TopicEntry(
+                topic_id, name, description, subject_id, subject_names.get(subject_id, ''), article_count
+            ))
+
+        subjects = []
+        for subject_id, name, description, created_at in subject_rows:
+            topics = tuple(topics_by_subject.get(subject_id, ()))
+            subjects.append(SubjectEntry(
+                id=subject_id,
+                name=name,
+                description=description,
+                created_at=created_at,
+                topics=topics,
+                article_count=sum(topic.article_count for topic in topics),
+                test_count=test_counts.get(subject_id, 0),
+            ))
+        return cls(subjects, version)
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.loaded_at < MAX_SNAPSHOT_AGE
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def get_taxonomy():
+    """Return the current taxonomy snapshot, reloading it if a source model changed."""
+    global _snapshot
+    version = tuple(page_cache.generations(SOURCE_MODELS))
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_current(version):
+        return snapshot
+    with _lock:
+        if _snapshot is None or not _snapshot.is_current(version):
+            _snapshot = Taxonomy.load(version)
+        return _snapshot
@@ -1,5 +1,7 @@
 from django import template
 
+from main.images import variants_current
+
 register = template.Library()
 
 
@@ -43,3 +45,37 @@ def multiply(value, arg):
         return int(value) * int(arg)
     except (ValueError, TypeError):
         return 0
+
+
+@register.simple_tag(takes_context=True)
+def query_string(context, **kwargs):
+    """Return the current query string with the given parameters replaced.
+
+    Parameters set to None or '' are removed.
+    Usage: <a href="{% query_string cursor=page_obj.next_cursor page=None %}">
+    """
+    params = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        if value is None or value == '':
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return '?' + params.urlencode()
+
+
+@register.inclusion_tag('includes/responsive_image.html')
+def responsive_image(image, variants, alt='', css_class='', sizes='100vw', style=''):
+    """Render an <img>, or a <picture> with WebP/JPEG srcsets once derivatives exist.
+
+    Usage: {% responsive_image article.featured_image article.featured_image_variants alt=article.title sizes="(min-width: 992px) 33vw, 100vw" %}
+    """
+    context = {'image': image, 'alt': alt, 'css_class': css_class, 'sizes': sizes, 'style': style}
+    if variants_current(image, variants):
+        storage = image.storage
+        entries = variants['sizes']
+        context.update({
+            'webp_srcset': ', '.join(f"{storage.url(entry['webp'])} {entry['width']}w" for entry in entries),
+            'jpeg_srcset': ', '.join(f"{storage.url(entry['jpeg'])} {entry['width']}w" for entry in entries),
+            'fallback_url': storage.url(entries[-1]['jpeg']),
+        })
+    return context
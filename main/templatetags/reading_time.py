@@ -1,5 +1,6 @@
 from django import template
-import math
+
+from main.content import reading_time_for
 
 register = template.Library()
 
@@ -7,6 +8,4 @@ register = template.Library()
 def reading_time(content):
     if not content:
         return 0
-    words = len(content.split())
-    minutes = max(1, math.ceil(words / 200))
-    return minutes
+    return reading_time_for(len(content.split()))
@@ -0,0 +1,88 @@
+"""Per-user bookmark and note state.
+
+Which articles a user has bookmarked or annotated is loaded in two small
+queries, cached per user and memoised on the request, so a whole page of
+article cards can be marked up without a query per card. The ``Bookmark`` and
+``Note`` receivers in ``main/models.py`` drop the cached copy on every change.
+"""
+from django.core.cache import cache
+
+STATE_KEY = 'article-state:{}'
+
+# Upper bound on staleness should an invalidation be lost
+STATE_TIMEOUT = 60 * 60
+
+
+class ArticleState:
+    def __init__(self, bookmarks=None, notes=None):
+        # article id -> bookmark created_at / note updated_at, as ISO strings
+        self.bookmarks = bookmarks or {}
+        self.notes = notes or {}
+
+    def is_bookmarked(self, article_id):
+        return article_id in self.bookmarks
+
+    def has_note(self, article_id):
+        return article_id in self.notes
+
+    def note_version(self, article_id):
+        return self.notes.get(article_id)
+
+    @property
+    def latest_bookmark(self):
+        return max(self.bookmarks.values(), default=None)
+
+    def for_articles(self, article_ids):
+        return {
+            article_id: {
+                'bookmarked': article_id in self.bookmarks,
+                'has_note': article_id in self.notes,
+            }
+            for article_id in article_ids
+        }
+
+    def annotate(self, articles):
+        """Set ``is_bookmarked`` and ``has_note`` on each article; returns ``articles``."""
+        for article in articles:
+            article.is_bookmarked = article.id in self.bookmarks
+            article.has_note = article.id in self.notes
+        return articles
+
+
+def _load(user_id):
+    from .models import Bookmark, Note
+
+    return {
+        'bookmarks': {
+            article_id: created_at.isoformat()
+            for article_id, created_at in Bookmark.objects.filter(user_id=user_id)
+            .values_list('article_id', 'created_at')
+        },
+        'notes': {
+            article_id: updated_at.isoformat()
+            for article_id, updated_at in Note.objects.filter(user_id=user_id)
+            .values_list('article_id', 'updated_at')
+        },
+    }
+
+
+def get_state(request):
+    """Bookmark/note state of the requesting user, loaded at most once per request."""
+    state = getattr(request, '_article_state', None)
+    if state is not None:
+        return state
+    if not request.user.is_authenticated:
+        state = ArticleState()
+    else:
+        key = STATE_KEY.format(request.user.pk)
+        data = cache.get(key)
+        if data is None:
+            data = _load(request.user.pk)
+            cache.set(key, data, STATE_TIMEOUT)
+        state = ArticleState(data['bookmarks'], data['notes'])
+    request._article_state = state
+    return state
+
+
+def invalidate(user_id):
+    cache.delete(STATE_KEY.format(user_id))
@@ -1,11 +1,18 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.db.models import Q, Count, Avg
 from django.contrib import messages
 from django.views.decorators.http import require_POST
-from .models import Article, Subject, Topic, Bookmark, Note
+from .models import Article, ArticleQuerySet, Subject, Topic, Bookmark, Note, RelatedArticle
 from .forms import ArticleCreateForm
+from .conditional import add_validators, make_etag, not_modified
+from . import page_cache
+from .page_cache import cache_anonymous_page
+from .pagination import CursorPaginator
+from .search import search_articles
+from .taxonomy import get_taxonomy
+from . import suggest, user_state, view_counter
 from tests.models import TestAttempt, MockTest
 from accounts.models import UserProfile
 import json
@@ -136,13 +143,14 @@ def debug_db_status(request):
             'error': str(e)
         }, status=500)
 
+@cache_anonymous_page('article', 'subject', 'topic', 'mocktest')
 def home(request):
     """Home page view"""
     try:
         # Get data for home page
-        subjects_count = Subject.objects.count()
+        taxonomy = get_taxonomy()
         
-        if subjects_count == 0:
+        if not taxonomy.subjects:
             # Tables exist but no data - show message
             context = {
                 'no_data': True,
@@ -153,8 +161,8 @@ def home(request):
             return render(request, 'main/home.html', context)
         
         # Get data for home page
-        featured_articles = Article.objects.select_related('topic__subject', 'author').filter(is_published=True)[:6]
-        subjects = Subject.objects.all()[:6]
+        featured_articles = Article.objects.cards().filter(is_published=True)[:6]
+        subjects = taxonomy.subjects[:6]
         
         # Try to get featured tests - handle if tests app isn't working
         try:
@@ -171,7 +179,7 @@ def home(request):
         return render(request, 'main/home.html', context)
         
     except Exception as e:
-        # If any error, show basic page with error info
+        # If any error, show basic page with error info; a 500 keeps it out of the page cache
         context = {
             'error': str(e),
             'featured_articles': [],
@@ -179,7 +187,7 @@ def home(request):
             'subjects': [],
             'no_data': True,
         }
-        return render(request, 'main/home.html', context)
+        return render(request, 'main/home.html', context, status=500)
 
 @login_required
 def dashboard(request):
@@ -387,8 +395,8 @@ def save_note(request):
 @login_required
 def dashboard(request):
     user_profile = request.user.userprofile
-    recent_attempts = TestAttempt.objects.filter(user=request.user, is_completed=True)[:5]
-    bookmarked_articles = Article.objects.filter(bookmark__user=request.user)[:5]
+    recent_attempts = TestAttempt.objects.filter(user=request.user, is_completed=True).select_related('mock_test')[:5]
+    bookmarked_articles = Article.objects.cards().filter(bookmark__user=request.user)[:5]
     
     # Performance statistics
     total_tests = TestAttempt.objects.filter(user=request.user, is_completed=True).count()
@@ -406,6 +414,19 @@ def dashboard(request):
             'date': attempt.completed_at
         })
     
+    # Per-subject accuracy summed from the summaries stored at grading time
+    subject_totals = {}
+    summaries = TestAttempt.objects.filter(user=request.user, is_completed=True).values_list('result_summary', flat=True)
+    for summary in summaries:
+        for subject in (summary or {}).get('subjects', []):
+            totals = subject_totals.setdefault(subject['name'], {'correct': 0, 'total': 0})
+            totals['correct'] += subject['correct']
+            totals['total'] += subject['total']
+    subject_accuracy = [
+        {'name': name, 'percentage': round(totals['correct'] * 100 / totals['total'], 1)}
+        for name, totals in subject_totals.items() if totals['total']
+    ]
+    
     context = {
         'user_profile': user_profile,
         'recent_attempts': recent_attempts,
@@ -413,6 +434,7 @@ def dashboard(request):
         'total_tests': total_tests,
         'avg_score': round(avg_score, 1),
         'recent_activity': recent_activity,
+        'subject_accuracy': subject_accuracy,
     }
     return render(request, 'main/dashboard.html', context)
 
@@ -440,10 +462,11 @@ def article_create(request):
 
     return render(request, 'main/article_create.html', {'form': form})
 
+@cache_anonymous_page('article', 'subject', 'topic')
 def article_list(request):
     from django.core.paginator import Paginator
-    articles_qs = Article.objects.filter(is_published=True)
-    subjects = Subject.objects.all()
+    articles_qs = Article.objects.cards().filter(is_published=True)
+    subjects = get_taxonomy().subjects
     difficulties = Article.DIFFICULTY_CHOICES
     
     # Filtering
@@ -459,22 +482,21 @@ def article_list(request):
         articles_qs = articles_qs.filter(difficulty=difficulty_filter)
     
     if search_query:
-        articles_qs = articles_qs.filter(
-            Q(title__icontains=search_query) | 
-            Q(content__icontains=search_query) |
-            Q(excerpt__icontains=search_query)
-        )
+        articles_qs = search_articles(articles_qs, search_query)
     
     # Bookmarks filter - only for authenticated users
     if bookmarked_filter and request.user.is_authenticated:
         articles_qs = articles_qs.filter(bookmark__user=request.user)
 
-    # Pagination
-    paginator = Paginator(articles_qs, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination: relevance-ranked search hits keep numbered pages; plain
+    # browsing seeks on (created_at, id) instead
+    if search_query:
+        paginator = Paginator(articles_qs, 9)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        page_obj = CursorPaginator(articles_qs, 9).get_page(request.GET.get('cursor'))
 
-    articles = page_obj.object_list
+    articles = user_state.get_state(request).annotate(list(page_obj.object_list))
     
     context = {
         'articles': articles,
@@ -489,28 +511,49 @@ def article_list(request):
     return render(request, 'main/article_list.html', context)
 
 def article_detail(request, slug):
-    article = get_object_or_404(Article, slug=slug, is_published=True)
-    
-    # Increment view count
-    article.views += 1
-    article.save()
+    # Validators only need the id and timestamp, not the article body
+    stub = get_object_or_404(Article.objects.only('id', 'updated_at'), slug=slug, is_published=True)
+    
+    # Buffered view count; flushed in batches by main.view_counter.
+    # Recorded before the conditional check so 304s still count as views.
+    view_counter.record_view(stub.id)
+    
+    # Bookmark/note flags come from the user's cached state (none for anonymous)
+    state = user_state.get_state(request)
+    is_bookmarked = state.is_bookmarked(stub.id)
+    
+    # The page also shows taxonomy names, other articles' cards and the related list,
+    # none of which move updated_at, so it is validated by ETag alone
+    related_ids = list(RelatedArticle.objects.filter(article_id=stub.id).values_list('related_id', flat=True))
+    etag = make_etag(
+        'article', stub.id, stub.updated_at.isoformat(), request.user.pk,
+        is_bookmarked, state.note_version(stub.id), related_ids,
+        *page_cache.generations(('article', 'subject', 'topic')),
+    )
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
     
-    # Check if bookmarked (for authenticated users)
-    is_bookmarked = False
+    # Only fetch the note body when the state says there is one
     user_note = None
+    if state.has_note(stub.id):
+        user_note = Note.objects.filter(user=request.user, article_id=stub.id).first()
     
-    if request.user.is_authenticated:
-        is_bookmarked = Bookmark.objects.filter(user=request.user, article=article).exists()
-        try:
-            user_note = Note.objects.get(user=request.user, article=article)
-        except Note.DoesNotExist:
-            user_note = None
+    article = Article.objects.select_related('topic__subject', 'author').get(pk=stub.pk)
+    article.views += view_counter.pending_views(article.id)
     
-    # Related articles
-    related_articles = Article.objects.filter(
-        topic=article.topic, 
-        is_published=True
-    ).exclude(id=article.id)[:3]
+    # Related articles, precomputed by main.related; same-topic until the first run
+    related_links = (
+        RelatedArticle.objects.filter(article=article, related__is_published=True)
+        .select_related('related')
+        .defer(*(f'related__{name}' for name in ArticleQuerySet.BODY_FIELDS))[:3]
+    )
+    related_articles = [link.related for link in related_links]
+    if not related_articles:
+        related_articles = Article.objects.cards().filter(
+            topic=article.topic, 
+            is_published=True
+        ).exclude(id=article.id)[:3]
     
     context = {
         'article': article,
@@ -518,34 +561,36 @@ def article_detail(request, slug):
         'user_note': user_note,
         'related_articles': related_articles,
     }
-    return render(request, 'main/article_detail.html', context)
+    response = render(request, 'main/article_detail.html', context)
+    return add_validators(response, etag)
 
 def article_search(request):
     query = request.GET.get('q', '')
-    articles = []
     
-    if query:
-        articles = Article.objects.filter(
-            Q(title__icontains=query) | 
-            Q(content__icontains=query),
-            is_published=True
-        )[:10]
+    # Title/topic/subject prefix matches come from the in-process index
+    results = list(suggest.suggest(query)) if query else []
     
-    results = [{
-        'id': article.id,
-        'title': article.title,
-        'excerpt': article.excerpt,
-        'url': f'/articles/{article.slug}/',
-        'difficulty': article.get_difficulty_display(),
-        'topic': article.topic.name
-    } for article in articles]
+    # Full-body matches from the database search top up a short suggestion list
+    if query and len(results) < suggest.SUGGESTION_LIMIT:
+        articles = search_articles(
+            Article.objects.cards().filter(is_published=True).exclude(pk__in=[result['id'] for result in results]),
+            query
+        )[:suggest.SUGGESTION_LIMIT - len(results)]
+        results += [{
+            'id': article.id,
+            'title': article.title,
+            'excerpt': article.excerpt,
+            'url': f'/articles/{article.slug}/',
+            'difficulty': article.get_difficulty_display(),
+            'topic': article.topic.name
+        } for article in articles]
     
     return JsonResponse({'results': results})
 
 @login_required
 @require_POST
 def toggle_bookmark(request, article_id):
-    article = get_object_or_404(Article, id=article_id)
+    article = get_object_or_404(Article.objects.only('id'), id=article_id)
     bookmark, created = Bookmark.objects.get_or_create(
         user=request.user, 
         article=article
@@ -578,20 +623,21 @@ def save_note(request):
     
     return JsonResponse({'success': True})
 
+@cache_anonymous_page('article', 'subject', 'topic', 'mocktest')
 def subject_list(request):
-    subjects = Subject.objects.annotate(
-        article_count=Count('topics__articles'),
-        test_count=Count('mock_tests')
-    )
+    subjects = get_taxonomy().subjects
     
     context = {'subjects': subjects}
     return render(request, 'main/subject_list.html', context)
 
+@cache_anonymous_page('article', 'subject', 'topic', 'mocktest')
 def subject_detail(request, subject_id):
-    subject = get_object_or_404(Subject, id=subject_id)
-    topics = subject.topics.all()
-    articles = Article.objects.filter(topic__subject=subject, is_published=True)[:10]
-    tests = MockTest.objects.filter(subject=subject, is_active=True)[:5]
+    subject = get_taxonomy().subject(subject_id)
+    if subject is None:
+        raise Http404('Subject not found')
+    topics = subject.topics
+    articles = Article.objects.cards().filter(topic__subject_id=subject.id, is_published=True)[:10]
+    tests = MockTest.objects.filter(subject_id=subject.id, is_active=True)[:5]
     
     context = {
         'subject': subject,
@@ -604,7 +650,22 @@ def subject_detail(request, subject_id):
 @login_required
 def bookmarks_api(request):
     """API endpoint to fetch user's bookmarks for the navigation dropdown"""
-    bookmarks = Bookmark.objects.filter(user=request.user).select_related('article', 'article__topic', 'article__topic__subject').order_by('-created_at')[:10]
+    # Validated without a query: the user's cached state plus the article generation stamp
+    state = user_state.get_state(request)
+    etag = make_etag(
+        'bookmarks', request.user.pk, len(state.bookmarks), state.latest_bookmark,
+        *page_cache.generations(['article']),
+    )
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+    
+    bookmarks = (
+        Bookmark.objects.filter(user=request.user)
+        .select_related('article', 'article__topic', 'article__topic__subject')
+        .defer(*(f'article__{name}' for name in ArticleQuerySet.BODY_FIELDS))
+        .order_by('-created_at')[:10]
+    )
     
     bookmarks_data = []
     for bookmark in bookmarks:
@@ -623,7 +684,21 @@ def bookmarks_api(request):
             }
         })
     
-    return JsonResponse({
+    response = JsonResponse({
         'bookmarks': bookmarks_data,
         'count': len(bookmarks_data)
-    })
\ No newline at end of file
+    })
+    return add_validators(response, etag)
+
+@login_required
+def article_state_api(request):
+    """Bookmark/note flags for a page of articles: /api/article-state/?ids=1,2,3"""
+    try:
+        article_ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'ids must be a comma-separated list of integers'}, status=400)
+    if len(article_ids) > 100:
+        return JsonResponse({'error': 'At most 100 ids per request'}, status=400)
+    
+    state = user_state.get_state(request)
+    return JsonResponse({'articles': state.for_articles(article_ids)})
@@ -0,0 +1,209 @@
+"""Computerised adaptive testing.
+
+An adaptive test serves one question at a time from the question pool, over
+the test's topics, and picks each one for the student's current ability.
+Items follow a two-parameter logistic model whose parameters come from the
+item-analysis calibration (:mod:`tests.item_analysis`). Questions without a
+calibration yet fall back to discrimination 1 and a difficulty taken from
+their hand-set level. Questions whose calibration shows a negative or zero
+discrimination are left out of the bank.
+
+For every topic the item bank precomputes Fisher information on a fixed
+ability grid, so choosing the next item is one row lookup and a partial sort:
+
+- the next topic is the one with the fewest questions served so far;
+- within it, one of the ``EXPOSURE_TOP`` most informative unseen items at
+  the current estimate is picked at random, so a class does not all see the
+  same paper.
+
+After each answer the ability is re-estimated as the posterior mean (EAP)
+over the same grid with a standard normal prior. The bank lives in process
+memory and is rebuilt when the questions or their calibration change.
+"""
+import random
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+from django.utils import timezone
+
+from main import page_cache
+
+from . import grading, question_pool
+from .item_analysis import MIN_RESPONSES
+from .models import Answer, QuestionStatistics, TestAttempt
+
+# Logistic scaling that makes the 2PL match the normal-ogive calibration
+SCALE = 1.702
+
+THETA = np.linspace(-4, 4, 161)
+THETA_STEP = THETA[1] - THETA[0]
+PRIOR = np.exp(-THETA ** 2 / 2)
+
+# Stand-in difficulties for questions that have not been calibrated yet
+DEFAULT_DIFFICULTY = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+DEFAULT_DISCRIMINATION = 1.0
+
+EXPOSURE_TOP = 3
+
+MAX_BANK_AGE = 300
+
+
+class ItemParameters(NamedTuple):
+    discrimination: float
+    difficulty: float
+    topic_id: int
+
+
+class TopicTable(NamedTuple):
+    question_ids: np.ndarray
+    # ability grid x items
+    information: np.ndarray
+    columns: dict
+
+
+def probability(theta, discrimination, difficulty):
+    return 1 / (1 + np.exp(-SCALE * discrimination * (theta - difficulty)))
+
+
+class ItemBank:
+    def __init__(self, parameters, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.parameters = parameters
+        by_topic = {}
+        for question_id, item in parameters.items():
+            by_topic.setdefault(item.topic_id, []).append(question_id)
+        self.tables = {}
+        for topic_id, question_ids in by_topic.items():
+            question_ids = np.array(sorted(question_ids), dtype=np.int64)
+            a = np.array([parameters[question_id].discrimination for question_id in question_ids])
+            b = np.array([parameters[question_id].difficulty for question_id in question_ids])
+            p = probability(THETA[:, None], a, b)
+            information = (SCALE * a) ** 2 * p * (1 - p)
+            self.tables[topic_id] = TopicTable(
+                question_ids,
+                information.astype(np.float32),
+                {question_id: column for column, question_id in enumerate(question_ids.tolist())},
+            )
+
+    @classmethod
+    def load(cls, version):
+        pool = question_pool.get_pool()
+        calibration = {
+            question_id: (responses, point_biserial, a, b)
+            for question_id, responses, point_biserial, a, b in QuestionStatistics.objects.values_list(
+                'question_id', 'responses', 'discrimination', 'irt_discrimination', 'irt_difficulty'
+            ).iterator()
+        }
+        parameters = {}
+        for question in pool.questions.values():
+            responses, point_biserial, a, b = calibration.get(question.id, (0, None, None, None))
+            if a is not None and b is not None:
+                parameters[question.id] = ItemParameters(a, b, question.topic_id)
+            elif responses >= MIN_RESPONSES and point_biserial is not None and point_biserial <= 0:
+                # Enough evidence that the question misleads; keep it out of adaptive papers
+                continue
+            else:
+                parameters[question.id] = ItemParameters(
+                    DEFAULT_DISCRIMINATION, DEFAULT_DIFFICULTY.get(question.difficulty, 0.0), question.topic_id
+                )
+        return cls(parameters, version)
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.loaded_at < MAX_BANK_AGE
+
+    def next_question(self, topic_ids, served, theta, rng=random):
+        """Most informative unseen question at ``theta``, or None when the topics are used up."""
+        counts = {topic_id: 0 for topic_id in topic_ids if topic_id in self.tables}
+        for question_id in served:
+            item = self.parameters.get(question_id)
+            if item is not None and item.topic_id in counts:
+                counts[item.topic_id] += 1
+
+        row = int(round((min(max(theta, THETA[0]), THETA[-1]) - THETA[0]) / THETA_STEP))
+        for topic_id in sorted(counts, key=lambda topic_id: (counts[topic_id], rng.random())):
+            table = self.tables[topic_id]
+            information = table.information[row].copy()
+            for question_id in served:
+                column = table.columns.get(question_id)
+                if column is not None:
+                    information[column] = -1
+            top = min(EXPOSURE_TOP, int((information >= 0).sum()))
+            if top == 0:
+                continue
+            best = np.argpartition(information, -top)[-top:]
+            return int(table.question_ids[best[rng.randrange(top)]])
+        return None
+
+    def estimate(self, responses):
+        """EAP ability and its standard error from ``(question_id, is_correct)`` pairs."""
+        posterior = PRIOR.copy()
+        for question_id, is_correct in responses:
+            item = self.parameters.get(question_id)
+            if item is None:
+                continue
+            p = probability(THETA, item.discrimination, item.difficulty)
+            posterior *= p if is_correct else 1 - p
+        posterior /= posterior.sum()
+        theta = float((THETA * posterior).sum())
+        se = float(np.sqrt(((THETA - theta) ** 2 * posterior).sum()))
+        return theta, se
+
+
+_lock = threading.Lock()
+_bank = None
+
+
+def get_bank():
+    global _bank
+    version = tuple(page_cache.generations(('question', 'questionstatistics')))
+    bank = _bank
+    if bank is not None and bank.is_current(version):
+        return bank
+    with _lock:
+        if _bank is None or not _bank.is_current(version):
+            _bank = ItemBank.load(version)
+        return _bank
+
+
+def first_question(test):
+    """Opening question for a new attempt at an average ability, or None if the bank has none."""
+    return get_bank().next_question(question_pool.blueprint_topics(test), (), 0.0)
+
+
+def record_answer(attempt, user_answer, seconds=0):
+    """Grade the attempt's current question, update the ability estimate and pick the next question.
+
+    The caller holds the attempt locked. Returns True when the test is over
+    (length reached, time up, or no questions left) and should be graded.
+    """
+    bank = get_bank()
+    question_id = attempt.question_ids[-1]
+    question = question_pool.get_pool().questions.get(question_id)
+    is_correct = question is not None and grading.normalize(user_answer) == grading.normalize(question.correct_answer)
+    Answer.objects.create(
+        test_attempt=attempt,
+        question_id=question_id,
+        user_answer=user_answer,
+        is_correct=is_correct,
+        marks_obtained=question.marks if is_correct else 0,
+        time_taken_seconds=max(0, seconds),
+    )
+
+    responses = list(Answer.objects.filter(test_attempt=attempt).values_list('question_id', 'is_correct'))
+    attempt.ability, attempt.ability_se = bank.estimate(responses)
+
+    test = attempt.mock_test
+    out_of_time = attempt.deadline is not None and timezone.now() >= attempt.deadline
+    next_id = None
+    if len(attempt.question_ids) < test.question_count and not out_of_time:
+        next_id = bank.next_question(question_pool.blueprint_topics(test), attempt.question_ids, attempt.ability)
+    if next_id is not None:
+        attempt.question_ids = attempt.question_ids + [next_id]
+
+    TestAttempt.objects.filter(pk=attempt.pk).update(
+        ability=attempt.ability, ability_se=attempt.ability_se, question_ids=attempt.question_ids
+    )
+    return next_id is None
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from main.models import Topic
 from .models import MockTest, Question, TestAttempt, Answer, Leaderboard
 
 @admin.register(MockTest)
@@ -8,22 +9,36 @@ class MockTestAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
     filter_horizontal = ('topics',)
 
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'topics':
+            kwargs['queryset'] = Topic.objects.select_related('subject')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ('id', 'mock_test', 'topic', 'question_type', 'difficulty', 'marks')
     list_filter = ('question_type', 'difficulty', 'topic__subject')
     search_fields = ('question_text',)
+    show_full_result_count = False
+    list_select_related = ('mock_test', 'topic__subject')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'topic':
+            kwargs['queryset'] = Topic.objects.select_related('subject')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 @admin.register(TestAttempt)
 class TestAttemptAdmin(admin.ModelAdmin):
     list_display = ('user', 'mock_test', 'percentage', 'is_completed', 'started_at')
     list_filter = ('is_completed', 'mock_test__subject')
     readonly_fields = ('started_at', 'completed_at')
+    show_full_result_count = False
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ('test_attempt', 'question', 'is_correct', 'marks_obtained')
     list_filter = ('is_correct',)
+    show_full_result_count = False
 
 @admin.register(Leaderboard)
 class LeaderboardAdmin(admin.ModelAdmin):
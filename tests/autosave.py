@@ -0,0 +1,170 @@
+"""Write-behind buffer for answers autosaved during a test attempt.
+
+The take-test page posts only the answers that changed since its last save.
+They are merged into a per-attempt buffer in the ``autosave`` cache alias,
+which is separate from the page cache and never culls entries. The
+questions changed since the last flush are written to ``Answer`` in one bulk
+upsert at most every ``TEST_AUTOSAVE_FLUSH_INTERVAL`` seconds. ``take_test``
+restores from the buffer.
+
+Every change to a buffer happens while the attempt row is locked with
+``select_for_update``, so overlapping autosaves cannot lose each other's
+changes, and none can land after a submission. SQLite, the development and
+default Render database, ignores ``select_for_update``, so there two
+overlapping autosaves of one attempt can still lose a change. Nothing waits
+on the next autosave to reach the database:
+
+- grading calls :func:`discard` first, which writes what is still unflushed;
+- ``expire_attempts`` calls :func:`flush_idle` for buffers left dirty by a
+  closed tab, well before the cache entry could expire.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+from .models import Answer, TestAttempt
+
+FLUSH_INTERVAL = getattr(settings, 'TEST_AUTOSAVE_FLUSH_INTERVAL', 60)
+
+cache = ConnectionProxy(caches, 'autosave')
+
+BUFFER_KEY = 'autosave:{}'
+
+# Buffers outlive any realistic test duration
+BUFFER_TIMEOUT = 24 * 60 * 60
+
+MAX_ANSWER_LENGTH = 500
+
+
+def _empty_buffer():
+    return {'answers': {}, 'dirty': set(), 'flushed_at': time.time()}
+
+
+def buffered_answers(attempt_id):
+    """Latest autosaved answers for the attempt, ``{question_id: answer}``."""
+    buffer = cache.get(BUFFER_KEY.format(attempt_id))
+    return dict(buffer['answers']) if buffer else {}
+
+
+def _unflushed(buffer):
+    return {question_id: buffer['answers'][question_id] for question_id in buffer['dirty']}
+
+
+def record(attempt_id, answers):
+    """Merge ``{question_id: answer}`` deltas into the buffer; flush if one is due.
+
+    The caller holds the attempt locked. Returns True if this call wrote the
+    buffer to the database.
+    """
+    key = BUFFER_KEY.format(attempt_id)
+    buffer = cache.get(key) or _empty_buffer()
+    for question_id, answer in answers.items():
+        if buffer['answers'].get(question_id) != answer:
+            buffer['answers'][question_id] = answer
+            buffer['dirty'].add(question_id)
+
+    flushed = False
+    if buffer['dirty'] and time.time() - buffer['flushed_at'] >= FLUSH_INTERVAL:
+        save_answers(attempt_id, _unflushed(buffer))
+        buffer['dirty'] = set()
+        buffer['flushed_at'] = time.time()
+        flushed = True
+    cache.set(key, buffer, BUFFER_TIMEOUT)
+    return flushed
+
+
+def discard(attempt_id):
+    discard_many([attempt_id])
+
+
+def discard_many(attempt_ids):
+    """Write the attempts' unflushed answers, then drop their buffers once the transaction commits.
+
+    Called while grading, with the attempts locked and before their answers
+    are read. If grading rolls back, the buffers are still there.
+    """
+    keys = [BUFFER_KEY.format(attempt_id) for attempt_id in attempt_ids]
+    buffers = cache.get_many(keys)
+    save_answers_many({
+        attempt_id: _unflushed(buffers[key])
+        for attempt_id, key in zip(attempt_ids, keys)
+        if key in buffers
+    })
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def flush_idle(attempt_ids):
+    """Write buffers with answers unflushed for FLUSH_INTERVAL or more; returns how many were written.
+
+    Attempts that are completed or locked by a request in progress are skipped.
+    """
+    now = time.time()
+    with transaction.atomic():
+        locked = list(
+            TestAttempt.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=attempt_ids, is_completed=False).values_list('id', flat=True)
+        )
+        buffers = cache.get_many([BUFFER_KEY.format(attempt_id) for attempt_id in locked])
+        due = {}
+        for attempt_id in locked:
+            buffer = buffers.get(BUFFER_KEY.format(attempt_id))
+            if buffer and buffer['dirty'] and now - buffer['flushed_at'] >= FLUSH_INTERVAL:
+                due[attempt_id] = buffer
+        if not due:
+            return 0
+        save_answers_many({attempt_id: _unflushed(buffer) for attempt_id, buffer in due.items()})
+        for buffer in due.values():
+            buffer['dirty'] = set()
+            buffer['flushed_at'] = now
+        # Written while the rows are still locked, so no autosave slips in between
+        cache.set_many({BUFFER_KEY.format(attempt_id): buffer for attempt_id, buffer in due.items()}, BUFFER_TIMEOUT)
+    return len(due)
+
+
+def save_answers(attempt_id, answers):
+    """Upsert ``{question_id: answer}`` for an attempt with one bulk update and one bulk insert."""
+    save_answers_many({attempt_id: answers})
+
+
+def save_answers_many(answers_by_attempt):
+    """Upsert ``{attempt_id: {question_id: answer}}`` with one bulk update and one bulk insert."""
+    answers_by_attempt = {attempt_id: answers for attempt_id, answers in answers_by_attempt.items() if answers}
+    if not answers_by_attempt:
+        return
+    with transaction.atomic():
+        existing = {
+            (answer.test_attempt_id, answer.question_id): answer
+            for answer in Answer.objects.filter(test_attempt_id__in=answers_by_attempt)
+            .only('id', 'test_attempt_id', 'question_id', 'user_answer')
+        }
+        changed, created = [], []
+        for attempt_id, answers in answers_by_attempt.items():
+            for question_id, user_answer in answers.items():
+                answer = existing.get((attempt_id, question_id))
+                if answer is None:
+                    created.append(Answer(test_attempt_id=attempt_id, question_id=question_id, user_answer=user_answer))
+                elif answer.user_answer != user_answer:
+                    answer.user_answer = user_answer
+                    changed.append(answer)
+        if changed:
+            Answer.objects.bulk_update(changed, ['user_answer'], batch_size=1000)
+        if created:
+            Answer.objects.bulk_create(created, batch_size=1000)
+
+
+def parse_answers(data, question_ids):
+    """``question_<id>`` fields of ``data`` that belong to ``question_ids``, keyed by int id."""
+    answers = {}
+    for field, value in data.items():
+        if not field.startswith('question_'):
+            continue
+        try:
+            question_id = int(field[len('question_'):])
+        except ValueError:
+            continue
+        if question_id in question_ids:
+            answers[question_id] = str(value)[:MAX_ANSWER_LENGTH]
+    return answers
@@ -0,0 +1,248 @@
+"""Class-wide export of a mock test's results.
+
+Every completed attempt is rendered to a PDF report plus one CSV row, and the
+lot is written to a single ZIP archive. Attempt ids are read in chunks, each
+chunk is rendered in a worker process (ReportLab is CPU-bound and would
+otherwise serialise on the GIL), and finished chunks are written to the
+archive in order while later ones are still rendering. Reports already
+rendered by :mod:`tests.reports` are reused, and newly rendered ones are
+stored for later single downloads.
+
+The worker processes form one pool of ``EXPORT_WORKERS`` per server process,
+shared by every export. Like single reports, archives are built by the
+background worker and stored under ``REPORT_ROOT`` with a version that changes
+with the test's results. The download view serves the finished file, so no
+request waits on rendering.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import connections
+from django.db.models import Count, Max, Sum
+
+from main import background
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 25
+
+WORKERS = getattr(settings, 'EXPORT_WORKERS', None) or min(4, multiprocessing.cpu_count())
+
+# How long a queued build blocks another one for the same export
+PENDING_TIMEOUT = 30 * 60
+
+CSV_HEADER = [
+    'attempt_id', 'username', 'name', 'email', 'completed_at', 'score', 'total_marks',
+    'percentage', 'correct', 'answered', 'questions', 'time_taken_minutes', 'subjects',
+]
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _render_chunk(attempt_ids):
+    """Worker: ``(filename, pdf_bytes, csv_row)`` for each attempt, in id order."""
+    from django.core.files.base import ContentFile
+
+    from . import grading, reports
+    from .models import TestAttempt
+
+    results = []
+    attempts = TestAttempt.objects.filter(pk__in=attempt_ids).select_related('mock_test', 'user').order_by('id')
+    for attempt in attempts:
+        summary = grading.result_summary(attempt)
+        name = reports.report_name(attempt)
+        if reports.storage.exists(name):
+            with reports.storage.open(name, 'rb') as handle:
+                pdf = handle.read()
+        else:
+            pdf = reports.build_pdf(attempt)
+            reports.storage.save(name, ContentFile(pdf))
+
+        user = attempt.user
+        results.append((
+            f'{user.username}_attempt_{attempt.id}.pdf',
+            pdf,
+            [
+                attempt.id, user.username, user.get_full_name(), user.email,
+                attempt.completed_at.isoformat() if attempt.completed_at else '',
+                attempt.total_score, attempt.mock_test.total_marks, round(attempt.percentage, 2),
+                summary['correct'], summary['answered'], summary['total'], summary['time_taken_minutes'],
+                '; '.join(f"{subject['name']} {subject['percentage']:.0f}%" for subject in summary['subjects']),
+            ],
+        ))
+    connections.close_all()
+    return results
+
+
+def _attempt_chunks(mock_test_id):
+    from .models import TestAttempt
+
+    chunk = []
+    attempt_ids = (
+        TestAttempt.objects.filter(mock_test_id=mock_test_id, is_completed=True)
+        .order_by('id').values_list('id', flat=True).iterator(chunk_size=CHUNK_SIZE * 10)
+    )
+    for attempt_id in attempt_ids:
+        chunk.append(attempt_id)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_pool():
+    """The process-wide render pool, started on first use and shared by every export."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _new_pool(WORKERS)
+        return _pool
+
+
+def _new_pool(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def write_zip(mock_test_id, handle, workers=None):
+    """Write a ZIP of every completed attempt's PDF plus ``results.csv`` to ``handle``; returns the attempt count.
+
+    With ``workers``, a private pool of that size renders the reports instead of the shared one.
+    """
+    if workers:
+        with _new_pool(workers) as pool:
+            return _write_zip(mock_test_id, handle, pool, workers * 2)
+    return _write_zip(mock_test_id, handle, get_pool(), WORKERS * 2)
+
+
+def _write_zip(mock_test_id, handle, pool, in_flight):
+    rows = io.StringIO()
+    writer = csv.writer(rows)
+    writer.writerow(CSV_HEADER)
+    count = 0
+
+    with zipfile.ZipFile(handle, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # Keep a bounded number of chunks in flight so memory stays flat
+        pending = deque()
+        chunks = _attempt_chunks(mock_test_id)
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(_render_chunk, chunk))
+                if len(pending) >= in_flight:
+                    break
+            while pending:
+                for filename, pdf, row in pending.popleft().result():
+                    # PDFs are already compressed
+                    archive.writestr(f'reports/{filename}', pdf, compress_type=zipfile.ZIP_STORED)
+                    writer.writerow(row)
+                    count += 1
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(pool.submit(_render_chunk, chunk))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next export
+            _discard_pool(pool)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+        archive.writestr('results.csv', rows.getvalue())
+    return count
+
+
+def export_version(mock_test_id):
+    """Changes whenever an attempt of the test is completed, regraded or deleted."""
+    from . import reports
+    from .models import TestAttempt
+
+    stats = TestAttempt.objects.filter(mock_test_id=mock_test_id, is_completed=True).aggregate(
+        count=Count('id'), last_id=Max('id'), last_completed=Max('completed_at'), scores=Sum('total_score'),
+    )
+    raw = json.dumps(stats, sort_keys=True, default=str) + f'|{reports.REPORT_FORMAT}'
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def export_name(mock_test_id):
+    return f'test_{mock_test_id}_results_{export_version(mock_test_id)}.zip'
+
+
+def get_export(mock_test_id):
+    """Name of the test's stored export, or None if it has not been built yet."""
+    from .reports import storage
+
+    name = export_name(mock_test_id)
+    return name if storage.exists(name) else None
+
+
+def schedule(mock_test_id):
+    """Queue a build of the test's current export unless it exists or is already queued."""
+    from .reports import storage
+
+    name = export_name(mock_test_id)
+    if storage.exists(name):
+        return
+    if cache.add(f'export-pending:{name}', True, PENDING_TIMEOUT):
+        background.submit(build, mock_test_id, name)
+
+
+def build(mock_test_id, name):
+    from .reports import storage
+
+    try:
+        if export_name(mock_test_id) != name:
+            # Results changed since this job was queued; the next request queues a fresh one
+            return
+        with tempfile.TemporaryFile() as handle:
+            write_zip(mock_test_id, handle)
+            handle.seek(0)
+            storage.save(name, File(handle))
+        _delete_stale(mock_test_id, name)
+    finally:
+        cache.delete(f'export-pending:{name}')
+
+
+def _delete_stale(mock_test_id, current):
+    from .reports import storage
+
+    prefix = f'test_{mock_test_id}_results_'
+    try:
+        _, files = storage.listdir('')
+    except FileNotFoundError:
+        return
+    for filename in files:
+        if filename.startswith(prefix) and filename != current:
+            try:
+                storage.delete(filename)
+            except OSError:
+                logger.warning('Could not delete stale export %s', filename)
@@ -0,0 +1,134 @@
+"""Server-enforced exam deadlines.
+
+Each attempt gets ``deadline = start + duration`` when it is created. Once
+the deadline plus ``TEST_SUBMIT_GRACE_SECONDS`` has passed, submissions and
+autosaves are refused. The attempt is then graded from what was saved by the
+deadline: its answer rows, after flushing the autosave buffer. It is marked
+complete as of the deadline.
+
+Abandoned attempts are picked up by :func:`sweep`, which
+``manage.py expire_attempts`` runs (schedule it every minute or so). It finds
+them with one range query on the ``(is_completed, deadline)`` index and
+grades them in batches. Each batch is a handful of bulk writes whatever its
+size. The sweep also flushes autosave buffers of open attempts that have sat
+unflushed for a while (see :func:`tests.autosave.flush_idle`).
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import UserProfile
+
+from . import autosave, distribution, grading, ranking
+from .models import Answer, TestAttempt
+
+BATCH_SIZE = 200
+
+GRACE = timedelta(seconds=getattr(settings, 'TEST_SUBMIT_GRACE_SECONDS', 30))
+
+GRADED_FIELDS = ['completed_at', 'total_score', 'percentage', 'time_taken_minutes', 'is_completed', 'result_summary']
+
+
+def deadline_for(test, started_at=None):
+    return (started_at or timezone.now()) + timedelta(minutes=test.duration_minutes)
+
+
+def is_expired(attempt, now=None):
+    """True once the attempt is past its deadline and the grace period."""
+    return attempt.deadline is not None and (now or timezone.now()) > attempt.deadline + GRACE
+
+
+def seconds_left(attempt, now=None):
+    if attempt.deadline is None:
+        return None
+    return max(0, int((attempt.deadline - (now or timezone.now())).total_seconds()))
+
+
+def expire(attempt_ids):
+    """Grade and complete the given attempts from their saved answers; returns how many were completed.
+
+    Attempts that are already completed, not yet expired, or locked by a
+    submission in progress are skipped.
+    """
+    cutoff = timezone.now() - GRACE
+    with transaction.atomic():
+        attempts = list(
+            TestAttempt.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=attempt_ids, is_completed=False, deadline__lt=cutoff)
+        )
+        if not attempts:
+            return 0
+        ids = [attempt.id for attempt in attempts]
+        autosave.discard_many(ids)
+
+        existing = {}
+        for answer in Answer.objects.filter(test_attempt_id__in=ids):
+            existing.setdefault(answer.test_attempt_id, {})[answer.question_id] = answer
+
+        answer_keys, changed, created = {}, [], []
+        for attempt in attempts:
+            if attempt.question_ids:
+                answer_key = grading.answer_key_for(attempt)
+            else:
+                if attempt.mock_test_id not in answer_keys:
+                    answer_keys[attempt.mock_test_id] = grading.get_answer_key(attempt.mock_test_id)
+                answer_key = answer_keys[attempt.mock_test_id]
+            saved = existing.get(attempt.id, {})
+            answers = {question_id: answer.user_answer for question_id, answer in saved.items()}
+
+            result = grading.prepare(attempt, answer_key, saved, answers, attempt.deadline)
+            for name, value in result.fields.items():
+                setattr(attempt, name, value)
+            changed += result.changed
+            created += result.created
+
+        TestAttempt.objects.bulk_update(attempts, GRADED_FIELDS, batch_size=BATCH_SIZE)
+        if changed:
+            Answer.objects.bulk_update(changed, ['user_answer', 'is_correct', 'marks_obtained'], batch_size=1000)
+        if created:
+            Answer.objects.bulk_create(created, batch_size=1000)
+
+        per_user = Counter(attempt.user_id for attempt in attempts)
+        for count in set(per_user.values()):
+            UserProfile.objects.filter(user_id__in=[user for user, n in per_user.items() if n == count]).update(
+                total_tests_taken=F('total_tests_taken') + count
+            )
+        by_test, by_user = {}, {}
+        for attempt in attempts:
+            by_test.setdefault(attempt.mock_test_id, []).append(attempt.percentage)
+            by_user.setdefault(attempt.user_id, []).append(attempt)
+        for mock_test_id, percentages in by_test.items():
+            distribution.record_many(mock_test_id, percentages)
+        for user_id, user_attempts in by_user.items():
+            ranking.record_attempts(
+                user_id,
+                [attempt.total_score for attempt in user_attempts],
+                [attempt.percentage for attempt in user_attempts],
+            )
+    return len(attempts)
+
+
+def sweep(batch_size=BATCH_SIZE):
+    """Complete every open attempt past its deadline; returns how many were completed.
+
+    Autosave buffers of the attempts still running are flushed if they are overdue.
+    """
+    now = timezone.now()
+    expired = list(
+        TestAttempt.objects.filter(is_completed=False, deadline__lt=now - GRACE)
+        .order_by('deadline').values_list('id', flat=True)
+    )
+    completed = 0
+    for start in range(0, len(expired), batch_size):
+        completed += expire(expired[start:start + batch_size])
+
+    running = list(
+        TestAttempt.objects.filter(is_completed=False, deadline__gte=now - GRACE).values_list('id', flat=True)
+    )
+    for start in range(0, len(running), batch_size):
+        autosave.flush_idle(running[start:start + batch_size])
+    return completed
@@ -0,0 +1,124 @@
+"""Per-test score distributions.
+
+Every completed attempt increments one bucket of its test's
+``ScoreHistogram`` (one bucket per whole percentage point). The increment
+runs in its own short transaction once grading has committed, so
+submissions of one test never hold its histogram row locked while they
+grade. Percentiles and charts read those 101 counts rather than scanning
+``TestAttempt``. ``manage.py rebuild_score_histograms`` recomputes them all
+from history and repairs any increment lost to a crash between the two
+commits.
+"""
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, Value
+from django.db.models.functions import Cast, Floor, Greatest, Least
+
+from .models import ScoreHistogram, TestAttempt
+
+BUCKETS = 101
+
+# Bars shown on result/detail pages, each covering this many buckets
+CHART_BAR_WIDTH = 10
+
+
+class ChartBar(NamedTuple):
+    low: int
+    high: int
+    count: int
+    height: float
+    is_current: bool
+
+
+def bucket_for(percentage):
+    return min(max(int(percentage), 0), BUCKETS - 1)
+
+
+def record(mock_test_id, percentage):
+    """Count one completed attempt once the grading transaction commits."""
+    record_many(mock_test_id, [percentage])
+
+
+def record_many(mock_test_id, percentages):
+    """Count several completed attempts of one test, with a single histogram write after commit."""
+    percentages = list(percentages)
+    # robust: a failed increment is logged, not raised into a response whose grading already committed
+    transaction.on_commit(lambda: _increment(mock_test_id, percentages), robust=True)
+
+
+def _increment(mock_test_id, percentages):
+    with transaction.atomic():
+        histogram, _ = ScoreHistogram.objects.select_for_update().get_or_create(
+            mock_test_id=mock_test_id, defaults={'counts': [0] * BUCKETS}
+        )
+        counts = histogram.counts or [0] * BUCKETS
+        for percentage in percentages:
+            counts[bucket_for(percentage)] += 1
+        histogram.counts = counts
+        histogram.total = sum(counts)
+        histogram.save(update_fields=['counts', 'total', 'updated_at'])
+
+
+def get_counts(mock_test_id):
+    counts = ScoreHistogram.objects.filter(mock_test_id=mock_test_id).values_list('counts', flat=True).first()
+    return counts or [0] * BUCKETS
+
+
+def percentile(counts, percentage):
+    """Share of attempts, in percent, that scored in a lower bucket than ``percentage``."""
+    total = sum(counts)
+    if not total:
+        return None
+    return sum(counts[:bucket_for(percentage)]) * 100 / total
+
+
+def chart(counts, percentage=None):
+    """Coarse bars for display, with heights relative to the tallest bar."""
+    current = bucket_for(percentage) if percentage is not None else None
+    sums = [
+        (low, min(low + CHART_BAR_WIDTH, BUCKETS) - 1, sum(counts[low:low + CHART_BAR_WIDTH]))
+        for low in range(0, BUCKETS - 1, CHART_BAR_WIDTH)
+    ]
+    # The lone 100% bucket is folded into the top bar
+    low, _, count = sums[-1]
+    sums[-1] = (low, BUCKETS - 1, count + sum(counts[low + CHART_BAR_WIDTH:]))
+    tallest = max((count for _, _, count in sums), default=0) or 1
+    return [
+        ChartBar(low, high, count, count * 100 / tallest, current is not None and low <= current <= high)
+        for low, high, count in sums
+    ]
+
+
+def rebuild_all():
+    """Recompute every histogram with one grouped query; returns the number of tests."""
+    bucket = Greatest(
+        Least(Cast(Floor('percentage'), IntegerField()), Value(BUCKETS - 1)),
+        Value(0),
+    )
+    rows = (
+        TestAttempt.objects.filter(is_completed=True).order_by()
+        .annotate(bucket=bucket).values('mock_test_id', 'bucket')
+        .annotate(count=Count('id'))
+    )
+    histograms = {}
+    for row in rows:
+        counts = histograms.setdefault(row['mock_test_id'], [0] * BUCKETS)
+        counts[row['bucket']] += row['count']
+
+    with transaction.atomic():
+        ScoreHistogram.objects.exclude(mock_test_id__in=histograms).delete()
+        existing = {h.mock_test_id: h for h in ScoreHistogram.objects.filter(mock_test_id__in=histograms)}
+        changed, created = [], []
+        for mock_test_id, counts in histograms.items():
+            histogram = existing.get(mock_test_id)
+            if histogram is None:
+                histogram = ScoreHistogram(mock_test_id=mock_test_id)
+                created.append(histogram)
+            else:
+                changed.append(histogram)
+            histogram.counts = counts
+            histogram.total = sum(counts)
+        ScoreHistogram.objects.bulk_update(changed, ['counts', 'total'])
+        ScoreHistogram.objects.bulk_create(created)
+    return len(histograms)
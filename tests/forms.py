@@ -1,10 +1,11 @@
 from django import forms
+from main.models import Topic
 from .models import MockTest
 
 class MockTestCreateForm(forms.ModelForm):
     class Meta:
         model = MockTest
-        fields = ['title', 'description', 'subject', 'topics', 'difficulty', 'duration_minutes', 'total_marks', 'is_active', 'is_featured']
+        fields = ['title', 'description', 'subject', 'topics', 'difficulty', 'duration_minutes', 'total_marks', 'is_active', 'is_featured', 'blueprint', 'is_adaptive']
         widgets = {
             'title': forms.TextInput(attrs={'class':'form-control'}),
             'description': forms.Textarea(attrs={'class':'form-control', 'rows':3}),
@@ -15,4 +16,50 @@ class MockTestCreateForm(forms.ModelForm):
             'total_marks': forms.NumberInput(attrs={'class':'form-control'}),
             'is_active': forms.CheckboxInput(attrs={'class':'form-check-input'}),
             'is_featured': forms.CheckboxInput(attrs={'class':'form-check-input'}),
+            'is_adaptive': forms.CheckboxInput(attrs={'class':'form-check-input'}),
+            'blueprint': forms.Textarea(attrs={'class':'form-control', 'rows':3,
+                                               'placeholder':'{"questions": 20, "difficulty_mix": {"easy": 1, "medium": 2, "hard": 1}}'}),
         }
+        help_texts = {
+            'blueprint': 'Leave empty to use the questions written for this test, or give rules to draw a random paper per attempt.',
+            'is_adaptive': 'Serve questions one at a time from the pool for the test topics, matched to each student; '
+                           'the blueprint\'s "questions" (or the number of questions written for the test) sets the length.',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['topics'].queryset = Topic.objects.select_related('subject')
+
+    def clean_blueprint(self):
+        blueprint = self.cleaned_data.get('blueprint') or {}
+        if not isinstance(blueprint, dict):
+            raise forms.ValidationError('The blueprint must be a JSON object.')
+        if blueprint:
+            questions = blueprint.get('questions')
+            if not isinstance(questions, int) or questions < 1:
+                raise forms.ValidationError('"questions" must be a positive whole number.')
+            mix = blueprint.get('difficulty_mix', {})
+            if not isinstance(mix, dict) or any(
+                key not in dict(MockTest.DIFFICULTY_CHOICES) or not isinstance(weight, (int, float)) or weight < 0
+                for key, weight in mix.items()
+            ):
+                raise forms.ValidationError('"difficulty_mix" maps easy/medium/hard to non-negative weights.')
+        return blueprint
+
+
+class QuestionImportForm(forms.Form):
+    file = forms.FileField(
+        help_text='CSV or JSON Lines; see tests/importer.py for the columns',
+        widget=forms.ClearableFileInput(attrs={'class':'form-control', 'accept':'.csv,.jsonl,.ndjson'}),
+    )
+    mock_test = forms.ModelChoiceField(
+        queryset=MockTest.objects.all(),
+        required=False,
+        help_text='Used for rows without a mock_test column',
+        widget=forms.Select(attrs={'class':'form-control'}),
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Validate only',
+        widget=forms.CheckboxInput(attrs={'class':'form-check-input'}),
+    )
@@ -0,0 +1,215 @@
+"""Grading of submitted test attempts.
+
+Each mock test's answer key (normalised correct answers and marks) is compiled
+once and cached under the ``mocktest``/``question`` generation stamps, so any
+edit to a test or its questions compiles a fresh key. A submission is graded
+in memory against the key and written back with one ``bulk_update`` and one
+``bulk_create``, together with a denormalised result summary on the attempt;
+the caller wraps it in the same transaction as the locked attempt.
+"""
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from main import page_cache
+from main.taxonomy import get_taxonomy
+
+from . import distribution, question_pool
+from .models import Answer, MockTest, Question, TestAttempt
+
+ANSWER_KEY_TIMEOUT = 60 * 60
+
+# Part of the cache key; bump whenever KeyEntry or AnswerKey change shape
+ANSWER_KEY_FORMAT = 2
+
+
+class KeyEntry(NamedTuple):
+    question_id: int
+    correct_answer: str
+    marks: int
+    topic_id: int
+
+
+class AnswerKey(NamedTuple):
+    mock_test_id: int
+    total_marks: int
+    entries: tuple
+
+
+class GradedAnswer(NamedTuple):
+    question_id: int
+    user_answer: str
+    is_correct: bool
+    marks_obtained: float
+
+
+def normalize(answer):
+    return answer.strip().lower()
+
+
+def get_answer_key(mock_test_id):
+    """Compiled answer key for a mock test, cached until the test or its questions change."""
+    stamps = '.'.join(str(stamp) for stamp in page_cache.generations(('mocktest', 'question')))
+    key = f'answer-key:v{ANSWER_KEY_FORMAT}:{mock_test_id}:{stamps}'
+    answer_key = cache.get(key)
+    if answer_key is None:
+        total_marks = MockTest.objects.filter(pk=mock_test_id).values_list('total_marks', flat=True).first()
+        entries = tuple(
+            KeyEntry(question_id, normalize(correct_answer), marks, topic_id)
+            for question_id, correct_answer, marks, topic_id in Question.objects.filter(mock_test_id=mock_test_id)
+            .order_by('id').values_list('id', 'correct_answer', 'marks', 'topic_id')
+        )
+        answer_key = AnswerKey(mock_test_id, total_marks or 0, entries)
+        cache.set(key, answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def answer_key_for(attempt):
+    """Answer key for ``attempt``; an assembled paper is keyed from the pool and marked out of its own total."""
+    if not attempt.question_ids:
+        return get_answer_key(attempt.mock_test_id)
+    pool = question_pool.get_pool()
+    entries = tuple(
+        KeyEntry(question.id, normalize(question.correct_answer), question.marks, question.topic_id)
+        for question in (pool.questions.get(question_id) for question_id in attempt.question_ids)
+        if question is not None
+    )
+    return AnswerKey(attempt.mock_test_id, sum(entry.marks for entry in entries), entries)
+
+
+def grade(answer_key, answers):
+    """Grade ``{question_id: answer}`` against ``answer_key``; unanswered questions score zero."""
+    graded = []
+    for entry in answer_key.entries:
+        user_answer = answers.get(entry.question_id, '')
+        is_correct = normalize(user_answer) == entry.correct_answer
+        graded.append(GradedAnswer(entry.question_id, user_answer, is_correct, entry.marks if is_correct else 0))
+    return graded
+
+
+def build_summary(rows, time_taken_minutes):
+    """Result summary from ``(topic_id, is_correct, answered)`` rows, one per question."""
+    taxonomy = get_taxonomy()
+    subjects, topics = {}, {}
+    correct = answered = 0
+    for topic_id, is_correct, was_answered in rows:
+        topic = taxonomy.topic(topic_id)
+        subject_name = topic.subject_name if topic else 'Other'
+        for group, key, defaults in (
+            (subjects, subject_name, {'name': subject_name}),
+            (topics, topic_id, {'id': topic_id, 'name': topic.name if topic else 'Other', 'subject': subject_name}),
+        ):
+            entry = group.setdefault(key, dict(defaults, correct=0, total=0))
+            entry['total'] += 1
+            entry['correct'] += int(is_correct)
+        correct += int(is_correct)
+        answered += int(was_answered)
+
+    for entry in (*subjects.values(), *topics.values()):
+        entry['percentage'] = entry['correct'] * 100 / entry['total']
+    return {
+        'correct': correct,
+        'total': len(rows),
+        'answered': answered,
+        'time_taken_minutes': time_taken_minutes,
+        'subjects': list(subjects.values()),
+        'topics': list(topics.values()),
+    }
+
+
+def result_summary(attempt):
+    """The attempt's stored summary, built from its answers and saved if it predates summaries."""
+    if attempt.result_summary:
+        return attempt.result_summary
+    rows = [
+        (topic_id, is_correct, bool(user_answer.strip()))
+        for topic_id, is_correct, user_answer in attempt.answers.order_by('question_id')
+        .values_list('question__topic_id', 'is_correct', 'user_answer')
+    ]
+    attempt.result_summary = build_summary(rows, attempt.time_taken_minutes)
+    TestAttempt.objects.filter(pk=attempt.pk).update(result_summary=attempt.result_summary)
+    return attempt.result_summary
+
+
+class GradingResult(NamedTuple):
+    graded: list
+    # Values for the attempt row
+    fields: dict
+    # Answer rows to bulk_update and to bulk_create
+    changed: list
+    created: list
+
+
+def prepare(attempt, answer_key, existing, answers, completed_at):
+    """Grade ``answers`` for ``attempt`` in memory and work out every row to write; writes nothing.
+
+    ``existing`` maps question ids to the attempt's saved Answer rows.
+    """
+    graded = grade(answer_key, answers)
+    changed, created = [], []
+    for result in graded:
+        answer = existing.get(result.question_id)
+        if answer is None:
+            created.append(Answer(
+                test_attempt=attempt,
+                question_id=result.question_id,
+                user_answer=result.user_answer,
+                is_correct=result.is_correct,
+                marks_obtained=result.marks_obtained,
+            ))
+        else:
+            answer.user_answer = result.user_answer
+            answer.is_correct = result.is_correct
+            answer.marks_obtained = result.marks_obtained
+            changed.append(answer)
+
+    total_score = sum(result.marks_obtained for result in graded)
+    time_taken_minutes = max(0, int((completed_at - attempt.started_at).total_seconds() / 60))
+    summary = build_summary([
+        (entry.topic_id, result.is_correct, bool(result.user_answer.strip()))
+        for entry, result in zip(answer_key.entries, graded)
+    ], time_taken_minutes)
+    fields = {
+        'completed_at': completed_at,
+        'total_score': total_score,
+        'percentage': (total_score / answer_key.total_marks) * 100 if answer_key.total_marks else 0,
+        'time_taken_minutes': time_taken_minutes,
+        'is_completed': True,
+        'result_summary': summary,
+    }
+    return GradingResult(graded, fields, changed, created)
+
+
+def grade_attempt(attempt, submitted, completed_at=None):
+    """Grade and complete ``attempt``, which the caller has locked with ``select_for_update``.
+
+    ``submitted`` holds the answers posted with the submission; questions
+    missing from it fall back to saved answers, so flush the autosave buffer
+    (``autosave.discard``) first.
+    ``completed_at`` defaults to now. Returns the graded answers, or None if
+    the attempt was completed concurrently and nothing was written.
+    """
+    answer_key = answer_key_for(attempt)
+
+    existing = {answer.question_id: answer for answer in Answer.objects.filter(test_attempt=attempt)}
+    answers = {question_id: answer.user_answer for question_id, answer in existing.items()}
+    answers.update(submitted)
+
+    result = prepare(attempt, answer_key, existing, answers, completed_at or timezone.now())
+    # Guarded on is_completed as well, for databases where select_for_update is a no-op
+    if not TestAttempt.objects.filter(pk=attempt.pk, is_completed=False).update(**result.fields):
+        return None
+    for name, value in result.fields.items():
+        setattr(attempt, name, value)
+
+    if result.changed:
+        Answer.objects.bulk_update(result.changed, ['user_answer', 'is_correct', 'marks_obtained'])
+    if result.created:
+        Answer.objects.bulk_create(result.created)
+
+    UserProfile.objects.filter(user_id=attempt.user_id).update(total_tests_taken=F('total_tests_taken') + 1)
+    distribution.record(attempt.mock_test_id, attempt.percentage)
+    return result.graded
@@ -0,0 +1,258 @@
+"""Streaming question-bank import from CSV or JSON Lines.
+
+Rows are read one at a time, validated, and inserted with ``bulk_create`` in
+batches, so memory use does not grow with the file. Topics are resolved
+through a name -> id map built once per import. Bad rows are reported with
+their line number and skipped; the rest of the file still imports. A line
+that is not valid UTF-8 stops the import there, since the rows after it are
+not trustworthy either. Rows before it are kept.
+
+Columns / keys:
+    question_text   required
+    question_type   mcq (default), numerical or true_false
+    options         JSON object of key -> label (mcq only); in CSV, option_<KEY>
+                    columns such as option_A, option_B work too
+    correct_answer  an option key (mcq), a number (numerical), true/false
+    topic           topic name; ``subject`` disambiguates duplicate names
+    mock_test       mock test id, unless a default test is given
+    explanation, marks (default 1), difficulty (easy/medium/hard)
+"""
+import csv
+import io
+import json
+import re
+from typing import NamedTuple
+
+from django.db import transaction
+
+from main import page_cache
+from main.models import Topic
+
+from .models import MockTest, Question
+
+BATCH_SIZE = 1000
+
+# Error messages kept for display; the count covers every failure
+MAX_REPORTED_ERRORS = 200
+
+QUESTION_TYPES = {value for value, _ in Question.QUESTION_TYPES}
+DIFFICULTIES = {value for value, _ in MockTest.DIFFICULTY_CHOICES}
+
+# Bytes that are not UTF-8 come through text_stream as lone surrogates
+_UNDECODABLE_RE = re.compile('[\udc80-\udcff]')
+
+
+class RowError(Exception):
+    pass
+
+
+class EncodingError(RowError):
+    pass
+
+
+class ImportResult(NamedTuple):
+    created: int
+    failed: int
+    errors: list
+    # Line of the first undecodable line when the import stopped early
+    stopped_at: int = None
+
+
+def _topic_map():
+    """``(subject, topic)`` and bare topic names (lowercased) -> topic id; ambiguous names map to None."""
+    by_pair, by_name = {}, {}
+    for topic_id, name, subject_name in Topic.objects.values_list('id', 'name', 'subject__name'):
+        name = name.strip().lower()
+        by_pair[(subject_name.strip().lower(), name)] = topic_id
+        by_name[name] = None if name in by_name else topic_id
+    return by_pair, by_name
+
+
+def _decoded(handle):
+    """Lines of ``handle``; raises EncodingError at the first one holding bytes that are not UTF-8."""
+    for line in handle:
+        if _UNDECODABLE_RE.search(line):
+            raise EncodingError('not valid UTF-8; save the file as UTF-8 and import the rest again')
+        yield line
+
+
+def read_csv(handle):
+    """``(line_number, row_dict)`` for each CSV record."""
+    reader = csv.DictReader(_decoded(handle))
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except EncodingError as exc:
+        yield reader.line_num + 1, exc
+
+
+def read_jsonl(handle):
+    line_number = 0
+    try:
+        for line_number, line in enumerate(_decoded(handle), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, RowError(f'invalid JSON: {exc}')
+                continue
+            yield line_number, row if isinstance(row, dict) else RowError('expected a JSON object')
+    except EncodingError as exc:
+        yield line_number + 1, exc
+
+
+def reader_for(filename, handle):
+    if filename.lower().endswith(('.jsonl', '.ndjson')):
+        return read_jsonl(handle)
+    if filename.lower().endswith('.csv'):
+        return read_csv(handle)
+    raise ValueError('Unsupported file type; use .csv or .jsonl')
+
+
+def text_stream(binary):
+    """Decode an uploaded or opened binary file lazily.
+
+    Invalid bytes are kept as surrogates rather than raised mid-read, so the
+    readers can report the exact line they are on.
+    """
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', errors='surrogateescape', newline='')
+
+
+def _options(row):
+    options = row.get('options')
+    if isinstance(options, str):
+        options = options.strip()
+        if options:
+            try:
+                options = json.loads(options)
+            except ValueError:
+                raise RowError('options is not valid JSON')
+    if not options:
+        options = {
+            key[len('option_'):]: value
+            for key, value in row.items()
+            if key and key.lower().startswith('option_') and value not in (None, '')
+        }
+    if not isinstance(options, dict):
+        raise RowError('options must be an object of key -> label')
+    return {str(key).strip(): str(label).strip() for key, label in options.items()}
+
+
+def build_question(row, topics, test_ids, default_test_id=None):
+    """Validated, unsaved Question for one input row; raises RowError."""
+    text = str(row.get('question_text') or '').strip()
+    if not text:
+        raise RowError('question_text is required')
+
+    question_type = str(row.get('question_type') or 'mcq').strip().lower()
+    if question_type not in QUESTION_TYPES:
+        raise RowError(f'unknown question_type {question_type!r}')
+
+    correct = str(row.get('correct_answer') or '').strip()
+    options = _options(row)
+    if question_type == 'mcq':
+        if len(options) < 2:
+            raise RowError('mcq questions need at least two options')
+        matches = [key for key in options if key.lower() == correct.lower()]
+        if not matches:
+            raise RowError(f'correct_answer {correct!r} is not one of the options {sorted(options)}')
+        correct = matches[0]
+    else:
+        if options:
+            raise RowError(f'{question_type} questions take no options')
+        if question_type == 'numerical':
+            try:
+                float(correct)
+            except ValueError:
+                raise RowError(f'correct_answer {correct!r} is not a number')
+        else:
+            correct = correct.lower()
+            if correct not in ('true', 'false'):
+                raise RowError("correct_answer must be 'true' or 'false'")
+
+    by_pair, by_name = topics
+    topic_name = str(row.get('topic') or '').strip().lower()
+    subject_name = str(row.get('subject') or '').strip().lower()
+    topic_id = by_pair.get((subject_name, topic_name)) if subject_name else by_name.get(topic_name)
+    if topic_id is None:
+        if not subject_name and topic_name in by_name:
+            raise RowError(f'topic {row.get("topic")!r} exists in several subjects; add a subject column')
+        raise RowError(f'unknown topic {row.get("topic")!r}')
+
+    mock_test_id = row.get('mock_test') or default_test_id
+    try:
+        mock_test_id = int(mock_test_id)
+    except (TypeError, ValueError):
+        raise RowError('mock_test id is required')
+    if mock_test_id not in test_ids:
+        raise RowError(f'unknown mock_test {mock_test_id}')
+
+    try:
+        marks = int(row.get('marks') or 1)
+    except (TypeError, ValueError):
+        raise RowError('marks must be a whole number')
+    if marks < 1:
+        raise RowError('marks must be at least 1')
+
+    difficulty = str(row.get('difficulty') or 'medium').strip().lower()
+    if difficulty not in DIFFICULTIES:
+        raise RowError(f'unknown difficulty {difficulty!r}')
+
+    return Question(
+        mock_test_id=mock_test_id,
+        topic_id=topic_id,
+        question_text=text,
+        question_type=question_type,
+        options=options,
+        correct_answer=correct,
+        explanation=str(row.get('explanation') or '').strip(),
+        marks=marks,
+        difficulty=difficulty,
+    )
+
+
+def import_rows(rows, default_test_id=None, dry_run=False, on_error=None):
+    """Import ``(line_number, row)`` pairs; returns an ImportResult.
+
+    ``on_error(line_number, message)`` is called for every rejected row.
+    An EncodingError row ends the import; the result's ``stopped_at`` says where.
+    """
+    topics = _topic_map()
+    test_ids = set(MockTest.objects.values_list('id', flat=True))
+    created = failed = 0
+    errors = []
+    stopped_at = None
+    batch = []
+
+    def flush():
+        nonlocal created
+        if batch and not dry_run:
+            with transaction.atomic():
+                Question.objects.bulk_create(batch)
+        created += len(batch)
+        batch.clear()
+
+    for line_number, row in rows:
+        try:
+            if isinstance(row, RowError):
+                raise row
+            batch.append(build_question(row, topics, test_ids, default_test_id))
+        except RowError as exc:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((line_number, str(exc)))
+            if on_error:
+                on_error(line_number, str(exc))
+            if isinstance(exc, EncodingError):
+                stopped_at = line_number
+                break
+            continue
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    if created and not dry_run:
+        # bulk_create sends no post_save, so move the question stamp by hand
+        page_cache.bump_generation('question')
+    return ImportResult(created, failed, errors, stopped_at)
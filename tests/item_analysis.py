@@ -0,0 +1,287 @@
+"""Item analysis of questions over the full answer history.
+
+Answers of completed attempts are streamed from the database in chunks and
+packed into flat NumPy arrays (question, attempt, correctness, time, chosen
+option), so millions of rows cost a few bytes each. Every statistic is then
+computed for all questions at once with ``bincount`` reductions; there are
+no per-question queries:
+
+- p-value: share of responses that were correct;
+- discrimination: point-biserial correlation between getting the question
+  right and the rest of the attempt's score (share correct on the attempt's
+  other questions);
+- mean time over answers that recorded one;
+- how often each MCQ option was chosen;
+- two-parameter IRT discrimination and difficulty, converted from the
+  p-value and point-biserial with Lord's normal-ogive approximations (used
+  by :mod:`tests.adaptive`).
+
+Answers from adaptive tests are left out. Those papers hold every student
+near 50% correct, so their rest scores barely track ability and would drag
+p-values towards 0.5 and discrimination towards zero. Left in, they would
+also make the adaptive bank drop its own most-used items.
+
+Results replace the ``QuestionStatistics`` table. Questions with enough
+responses are flagged when they are too easy, too hard, do not discriminate,
+or have a distractor that beats the key or is hardly ever chosen.
+"""
+from itertools import islice
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+from django.db import transaction
+
+from main import page_cache
+
+from .models import Answer, Question, QuestionStatistics
+
+CHUNK_SIZE = 50000
+
+# Below this many responses a question gets statistics but no flags
+MIN_RESPONSES = 30
+
+TOO_EASY_P = 0.9
+TOO_HARD_P = 0.2
+LOW_DISCRIMINATION = 0.2
+# Distractors chosen by fewer responses than this share are not doing their job
+MIN_DISTRACTOR_SHARE = 0.05
+
+# p-value bands for the suggested difficulty
+EASY_P = 0.7
+HARD_P = 0.3
+
+# Biserial correlations are clipped to this range before conversion, which
+# bounds IRT discrimination to roughly 0.05-3
+BISERIAL_RANGE = (0.05, 0.95)
+IRT_DIFFICULTY_RANGE = (-4.0, 4.0)
+
+BLANK = 0
+
+
+class AnswerArrays(NamedTuple):
+    question_ids: np.ndarray
+    attempt_ids: np.ndarray
+    correct: np.ndarray
+    seconds: np.ndarray
+    # BLANK, an index into ``option_keys`` (offset by one), or len(option_keys) + 1 for anything else
+    choices: np.ndarray
+    option_keys: tuple
+
+
+def option_vocabulary():
+    """Every MCQ option key in use (lowercased) -> choice code, starting at 1."""
+    keys = set()
+    for options in Question.objects.filter(question_type='mcq').values_list('options', flat=True).iterator():
+        keys.update(str(key).strip().lower() for key in options or {})
+    return {key: code for code, key in enumerate(sorted(keys), start=1)}
+
+
+def load_answers(chunk_size=CHUNK_SIZE):
+    """Answers of every completed fixed-paper attempt as AnswerArrays, read ``chunk_size`` rows at a time."""
+    vocabulary = option_vocabulary()
+    other = len(vocabulary) + 1
+    rows = (
+        Answer.objects.filter(test_attempt__is_completed=True)
+        .exclude(test_attempt__mock_test__is_adaptive=True)
+        .values_list('question_id', 'test_attempt_id', 'is_correct', 'time_taken_seconds', 'user_answer')
+        .iterator(chunk_size=chunk_size)
+    )
+    parts = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        question_ids, attempt_ids, correct, seconds, answers = zip(*chunk)
+        choices = [
+            vocabulary.get(answer, other) if answer else BLANK
+            for answer in (answer.strip().lower() for answer in answers)
+        ]
+        parts.append((
+            np.array(question_ids, dtype=np.int64),
+            np.array(attempt_ids, dtype=np.int64),
+            np.array(correct, dtype=np.int8),
+            np.array(seconds, dtype=np.int32),
+            np.array(choices, dtype=np.int32),
+        ))
+
+    if parts:
+        columns = [np.concatenate(column) for column in zip(*parts)]
+    else:
+        columns = [np.empty(0, dtype=dtype) for dtype in (np.int64, np.int64, np.int8, np.int32, np.int32)]
+    return AnswerArrays(*columns, option_keys=tuple(vocabulary))
+
+
+class ItemStatistics(NamedTuple):
+    question_ids: np.ndarray
+    responses: np.ndarray
+    answered: np.ndarray
+    p_value: np.ndarray
+    # NaN where undefined (every response right, or every response wrong)
+    discrimination: np.ndarray
+    mean_seconds: np.ndarray
+    # questions x choice codes
+    choice_counts: np.ndarray
+    # NaN where the point-biserial is undefined or not positive
+    irt_discrimination: np.ndarray
+    irt_difficulty: np.ndarray
+
+
+def analyse(arrays):
+    """Per-question statistics for ``arrays`` in one vectorised pass."""
+    question_ids, item = np.unique(arrays.question_ids, return_inverse=True)
+    _, attempt = np.unique(arrays.attempt_ids, return_inverse=True)
+    items = len(question_ids)
+    correct = arrays.correct.astype(np.float64)
+
+    # Rest score: share correct on the attempt's other questions
+    attempt_correct = np.bincount(attempt, weights=correct)
+    attempt_size = np.bincount(attempt)
+    others = attempt_size[attempt] - 1
+    rest = np.divide(attempt_correct[attempt] - correct, others, out=np.zeros_like(correct), where=others > 0)
+
+    responses = np.bincount(item, minlength=items)
+    right = np.bincount(item, weights=correct, minlength=items)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_value = right / responses
+        rest_mean = np.bincount(item, weights=rest, minlength=items) / responses
+        rest_var = np.bincount(item, weights=rest * rest, minlength=items) / responses - rest_mean ** 2
+        covariance = np.bincount(item, weights=rest * correct, minlength=items) / responses - p_value * rest_mean
+        discrimination = covariance / np.sqrt(rest_var * p_value * (1 - p_value))
+        discrimination[~np.isfinite(discrimination)] = np.nan
+
+        timed = arrays.seconds > 0
+        mean_seconds = (
+            np.bincount(item, weights=arrays.seconds, minlength=items)
+            / np.bincount(item, weights=timed, minlength=items)
+        )
+
+    codes = len(arrays.option_keys) + 2
+    choice_counts = np.bincount(item * codes + arrays.choices, minlength=items * codes).reshape(items, codes)
+    answered = responses - choice_counts[:, BLANK]
+    return ItemStatistics(
+        question_ids, responses, answered, p_value, discrimination, mean_seconds, choice_counts,
+        *calibrate(p_value, discrimination),
+    )
+
+
+def calibrate(p_value, discrimination):
+    """Normal-ogive IRT ``(discrimination, difficulty)`` arrays from classical item statistics."""
+    p = np.clip(p_value, 0.01, 0.99)
+    z = np.vectorize(NormalDist().inv_cdf, otypes=[np.float64])(p)
+    density = np.exp(-z * z / 2) / np.sqrt(2 * np.pi)
+    with np.errstate(invalid='ignore'):
+        usable = discrimination > 0
+        biserial = np.clip(discrimination * np.sqrt(p * (1 - p)) / density, *BISERIAL_RANGE)
+        irt_a = np.where(usable, biserial / np.sqrt(1 - biserial ** 2), np.nan)
+        irt_b = np.where(usable, np.clip(-z / biserial, *IRT_DIFFICULTY_RANGE), np.nan)
+    return irt_a, irt_b
+
+
+def suggested_difficulty(p_value):
+    if p_value >= EASY_P:
+        return 'easy'
+    if p_value < HARD_P:
+        return 'hard'
+    return 'medium'
+
+
+def flag(responses, p_value, discrimination, option_counts, correct_answer):
+    """Reasons a question needs review; empty when it looks fine or has too few responses."""
+    if responses < MIN_RESPONSES:
+        return []
+    flags = []
+    if p_value > TOO_EASY_P:
+        flags.append('too easy')
+    elif p_value < TOO_HARD_P:
+        flags.append('too hard')
+    if discrimination is not None:
+        if discrimination < 0:
+            flags.append('negative discrimination - check the answer key')
+        elif discrimination < LOW_DISCRIMINATION:
+            flags.append('low discrimination')
+    correct_answer = correct_answer.strip().lower()
+    key_count = sum(count for option, count in option_counts.items() if option.lower() == correct_answer)
+    for option, count in option_counts.items():
+        if option.lower() == correct_answer:
+            continue
+        if count > key_count:
+            flags.append(f'distractor {option} chosen more often than the key')
+        elif count < MIN_DISTRACTOR_SHARE * responses:
+            flags.append(f'distractor {option} rarely chosen')
+    return flags
+
+
+def _optional(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def build_rows(stats, option_keys):
+    """Unsaved QuestionStatistics for every analysed question."""
+    codes = {key: code for code, key in enumerate(option_keys, start=1)}
+    analysed = set(stats.question_ids.tolist())
+    # One pass over the questions table; an IN list of every id would outgrow some backends' limits
+    questions = {
+        question_id: (question_type, options or {}, correct_answer)
+        for question_id, question_type, options, correct_answer in Question.objects
+        .values_list('id', 'question_type', 'options', 'correct_answer').iterator()
+        if question_id in analysed
+    }
+    rows = []
+    for index, question_id in enumerate(stats.question_ids.tolist()):
+        if question_id not in questions:
+            continue
+        question_type, options, correct_answer = questions[question_id]
+        option_counts = {}
+        if question_type == 'mcq':
+            for key in options:
+                # Options added since the vocabulary was read have no answers yet
+                code = codes.get(str(key).strip().lower())
+                option_counts[str(key)] = int(stats.choice_counts[index, code]) if code else 0
+        responses = int(stats.responses[index])
+        p_value = float(stats.p_value[index])
+        discrimination = _optional(stats.discrimination[index])
+        calibrated = responses >= MIN_RESPONSES
+        rows.append(QuestionStatistics(
+            question_id=question_id,
+            responses=responses,
+            answered=int(stats.answered[index]),
+            p_value=round(p_value, 4),
+            discrimination=discrimination,
+            mean_time_seconds=_optional(stats.mean_seconds[index]),
+            irt_discrimination=_optional(stats.irt_discrimination[index]) if calibrated else None,
+            irt_difficulty=_optional(stats.irt_difficulty[index]) if calibrated else None,
+            option_counts=option_counts,
+            suggested_difficulty=suggested_difficulty(p_value),
+            flags=flag(responses, p_value, discrimination, option_counts, correct_answer),
+        ))
+    return rows
+
+
+def run(chunk_size=CHUNK_SIZE, apply_difficulty=False):
+    """Recompute the statistics table; returns the saved rows.
+
+    With ``apply_difficulty``, questions with at least MIN_RESPONSES
+    responses take their suggested difficulty.
+    """
+    arrays = load_answers(chunk_size)
+    rows = build_rows(analyse(arrays), arrays.option_keys)
+    with transaction.atomic():
+        QuestionStatistics.objects.all().delete()
+        QuestionStatistics.objects.bulk_create(rows, batch_size=1000)
+    # Adaptive item banks are rebuilt from the new calibration
+    page_cache.bump_generation('questionstatistics')
+
+    if apply_difficulty:
+        suggested = {row.question_id: row.suggested_difficulty for row in rows if row.responses >= MIN_RESPONSES}
+        changed = []
+        # Walk the whole bank rather than sending every id in one IN list
+        for question in Question.objects.only('id', 'difficulty').iterator():
+            if question.id in suggested and question.difficulty != suggested[question.id]:
+                question.difficulty = suggested[question.id]
+                changed.append(question)
+        if changed:
+            Question.objects.bulk_update(changed, ['difficulty'], batch_size=1000)
+            # bulk_update sends no post_save, so move the question stamp by hand
+            page_cache.bump_generation('question')
+    return rows
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tests import item_analysis
+
+
+class Command(BaseCommand):
+    help = 'Recompute difficulty and discrimination statistics for every question from the answer history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=item_analysis.CHUNK_SIZE,
+                            help='Answer rows read from the database at a time')
+        parser.add_argument('--apply-difficulty', action='store_true',
+                            help='Set each question with enough responses to its suggested difficulty')
+
+    def handle(self, *args, **options):
+        rows = item_analysis.run(options['chunk_size'], apply_difficulty=options['apply_difficulty'])
+        flagged = sum(1 for row in rows if row.flags)
+        self.stdout.write(self.style.SUCCESS(f'Analysed {len(rows)} questions; {flagged} flagged for review'))
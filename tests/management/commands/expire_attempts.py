@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tests import deadlines
+
+
+class Command(BaseCommand):
+    help = 'Grade and complete open test attempts whose deadline has passed; schedule it every minute or so'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=deadlines.BATCH_SIZE,
+                            help='Attempts graded per transaction')
+
+    def handle(self, *args, **options):
+        completed = deadlines.sweep(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Completed {completed} expired attempts'))
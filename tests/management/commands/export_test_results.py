@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tests import class_export
+from tests.models import MockTest
+
+
+class Command(BaseCommand):
+    help = 'Export every completed attempt of a mock test as PDF reports plus a CSV, in one ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_id', type=int)
+        parser.add_argument('--output', help='ZIP file to write (default: test_<id>_results.zip)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: EXPORT_WORKERS, or the CPU count up to 4)')
+
+    def handle(self, *args, **options):
+        test_id = options['test_id']
+        if not MockTest.objects.filter(pk=test_id).exists():
+            raise CommandError(f'Mock test {test_id} does not exist')
+
+        output = options['output'] or f'test_{test_id}_results.zip'
+        with open(output, 'wb') as handle:
+            count = class_export.write_zip(test_id, handle, workers=options['workers'])
+            size = handle.tell()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output}: {count} attempts, {size:,} bytes'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tests import importer
+
+
+class Command(BaseCommand):
+    help = 'Stream questions from a CSV or JSON Lines file into the question bank'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv or .jsonl file')
+        parser.add_argument('--test', type=int, dest='test_id', help='Mock test id for rows without a mock_test column')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without saving')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            handle = open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+
+        def report(line_number, message):
+            self.stderr.write(f'line {line_number}: {message}')
+
+        with handle:
+            try:
+                rows = importer.reader_for(path, importer.text_stream(handle))
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            result = importer.import_rows(
+                rows, default_test_id=options['test_id'], dry_run=options['dry_run'], on_error=report
+            )
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        if result.stopped_at:
+            raise CommandError(
+                f'Stopped at line {result.stopped_at}; {verb.lower()} {result.created} questions before it, '
+                f'{result.failed} rows rejected'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{verb} {result.created} questions, {result.failed} rows rejected'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tests import distribution
+
+
+class Command(BaseCommand):
+    help = 'Recompute the score histogram of every mock test from completed attempts'
+
+    def handle(self, *args, **options):
+        count = distribution.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt score histograms for {count} tests'))
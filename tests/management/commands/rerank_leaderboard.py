@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from tests import ranking
+
+
+class Command(BaseCommand):
+    help = 'Recompute leaderboard ranks, optionally rebuilding totals from completed attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-totals', action='store_true',
+            help='Recompute scores, test counts and averages from completed attempts first',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild_totals']:
+            count = ranking.rebuild_totals()
+            self.stdout.write(f'Rebuilt totals for {count} users')
+        corrected = ranking.rerank()
+        self.stdout.write(self.style.SUCCESS(f'Corrected {corrected} ranks'))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:11
+
+from django.db import migrations, models
+
+
+def rank_existing_entries(apps, schema_editor):
+    Leaderboard = apps.get_model('tests', 'Leaderboard')
+    entries = list(Leaderboard.objects.only('id', 'total_score', 'rank').order_by('-total_score'))
+    higher = 0
+    for index, entry in enumerate(entries):
+        if index and entry.total_score < entries[index - 1].total_score:
+            higher = index
+        entry.rank = higher + 1
+    Leaderboard.objects.bulk_update(entries, ['rank'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaderboard',
+            name='total_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.RunPython(rank_existing_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0002_leaderboard_score_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counts', models.JSONField(default=list)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mock_test', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_histogram', to='tests.mocktest')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0003_scorehistogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testattempt',
+            name='result_summary',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
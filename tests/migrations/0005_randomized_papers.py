@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0004_testattempt_result_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mocktest',
+            name='blueprint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='question_ids',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0005_randomized_papers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('answered', models.PositiveIntegerField(default=0)),
+                ('p_value', models.FloatField(default=0)),
+                ('discrimination', models.FloatField(blank=True, null=True)),
+                ('mean_time_seconds', models.FloatField(blank=True, null=True)),
+                ('option_counts', models.JSONField(blank=True, default=dict)),
+                ('suggested_difficulty', models.CharField(blank=True, choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=10)),
+                ('flags', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='tests.question')),
+            ],
+            options={
+                'verbose_name_plural': 'question statistics',
+            },
+        ),
+    ]
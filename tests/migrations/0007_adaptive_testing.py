@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0006_question_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mocktest',
+            name='is_adaptive',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='irt_difficulty',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='irt_discrimination',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='ability',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='ability_se',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
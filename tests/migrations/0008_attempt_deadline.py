@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:25
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_open_deadlines(apps, schema_editor):
+    MockTest = apps.get_model('tests', 'MockTest')
+    TestAttempt = apps.get_model('tests', 'TestAttempt')
+    for test_id, duration_minutes in MockTest.objects.values_list('id', 'duration_minutes'):
+        TestAttempt.objects.filter(mock_test_id=test_id, is_completed=False).update(
+            deadline=F('started_at') + timedelta(minutes=duration_minutes)
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0007_adaptive_testing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['is_completed', 'deadline'], name='attempt_open_deadline_idx'),
+        ),
+        migrations.RunPython(set_open_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+BUCKETS = 101
+
+
+def backfill_histograms(apps, schema_editor):
+    """Count the attempts completed before histograms were kept."""
+    ScoreHistogram = apps.get_model('tests', 'ScoreHistogram')
+    TestAttempt = apps.get_model('tests', 'TestAttempt')
+
+    histograms = {}
+    rows = TestAttempt.objects.filter(is_completed=True).values_list('mock_test_id', 'percentage')
+    for mock_test_id, percentage in rows.iterator(chunk_size=2000):
+        counts = histograms.setdefault(mock_test_id, [0] * BUCKETS)
+        counts[min(max(int(percentage), 0), BUCKETS - 1)] += 1
+
+    ScoreHistogram.objects.all().delete()
+    ScoreHistogram.objects.bulk_create(
+        [
+            ScoreHistogram(mock_test_id=mock_test_id, counts=counts, total=sum(counts))
+            for mock_test_id, counts in histograms.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0008_attempt_deadline'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
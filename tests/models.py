@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from main import page_cache
 from main.models import Subject, Topic
 import json
 
@@ -19,6 +22,11 @@ class MockTest(models.Model):
     total_marks = models.PositiveIntegerField(default=100)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # Optional random-paper rules, e.g. {"questions": 20, "difficulty_mix": {"easy": 1, "medium": 2, "hard": 1}};
+    # when set, each attempt draws its own questions from the pool (see tests.question_pool)
+    blueprint = models.JSONField(default=dict, blank=True)
+    # Serve one question at a time, each chosen for the student's current ability estimate (see tests.adaptive)
+    is_adaptive = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,8 +36,14 @@ class MockTest(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def is_randomized(self):
+        return bool(self.blueprint and self.blueprint.get('questions')) and not self.is_adaptive
+
     @property
     def question_count(self):
+        if self.blueprint and self.blueprint.get('questions'):
+            return int(self.blueprint['questions'])
         return self.questions.count()
 
 class Question(models.Model):
@@ -58,13 +72,26 @@ class TestAttempt(models.Model):
     mock_test = models.ForeignKey(MockTest, on_delete=models.CASCADE)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # started_at + the test's duration; open attempts past it are graded by tests.deadlines
+    deadline = models.DateTimeField(null=True, blank=True, editable=False)
     total_score = models.FloatField(default=0)
     percentage = models.FloatField(default=0)
     time_taken_minutes = models.PositiveIntegerField(default=0)
     is_completed = models.BooleanField(default=False)
+    # Written at grading time: totals plus per-subject/per-topic breakdowns (see tests.grading)
+    result_summary = models.JSONField(default=dict, blank=True, editable=False)
+    # Question ids of a randomly assembled paper, in display order; empty for fixed tests
+    question_ids = models.JSONField(default=list, blank=True, editable=False)
+    # Adaptive tests: running ability estimate (logit scale) and its standard error
+    ability = models.FloatField(null=True, blank=True, editable=False)
+    ability_se = models.FloatField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # The expiry sweep's range scan: open attempts ordered by deadline
+            models.Index(fields=['is_completed', 'deadline'], name='attempt_open_deadline_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.mock_test.title}"
@@ -82,7 +109,8 @@ class Answer(models.Model):
 
 class Leaderboard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    total_score = models.FloatField(default=0)
+    # Indexed for rank lookups: rank = 1 + rows with a higher score
+    total_score = models.FloatField(default=0, db_index=True)
     tests_completed = models.PositiveIntegerField(default=0)
     average_percentage = models.FloatField(default=0)
     rank = models.PositiveIntegerField(default=0)
@@ -92,4 +120,46 @@ class Leaderboard(models.Model):
         ordering = ['rank']
 
     def __str__(self):
-        return f"{self.user.username} - Rank {self.rank}"
\ No newline at end of file
+        return f"{self.user.username} - Rank {self.rank}"
+
+class ScoreHistogram(models.Model):
+    """Completed attempts of a mock test counted per whole percentage point (0-100)."""
+    mock_test = models.OneToOneField(MockTest, on_delete=models.CASCADE, related_name='score_histogram')
+    counts = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.mock_test.title} - {self.total} attempts"
+
+class QuestionStatistics(models.Model):
+    """Item analysis of a question over every completed attempt (see tests.item_analysis)."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='statistics')
+    responses = models.PositiveIntegerField(default=0)
+    answered = models.PositiveIntegerField(default=0)
+    # Share of responses that were correct
+    p_value = models.FloatField(default=0)
+    # Point-biserial correlation of correctness with the rest of the attempt's score
+    discrimination = models.FloatField(null=True, blank=True)
+    mean_time_seconds = models.FloatField(null=True, blank=True)
+    # Two-parameter IRT calibration; null until the question has enough responses
+    irt_discrimination = models.FloatField(null=True, blank=True)
+    irt_difficulty = models.FloatField(null=True, blank=True)
+    # MCQ option key -> times chosen
+    option_counts = models.JSONField(default=dict, blank=True)
+    suggested_difficulty = models.CharField(max_length=10, choices=MockTest.DIFFICULTY_CHOICES, blank=True)
+    flags = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'question statistics'
+
+    def __str__(self):
+        return f"Q{self.question_id} - p={self.p_value:.2f}"
+
+@receiver(post_save, sender=MockTest)
+@receiver(post_delete, sender=MockTest)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_cached_pages(sender, **kwargs):
+    page_cache.bump_generation(sender._meta.model_name)
\ No newline at end of file
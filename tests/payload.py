@@ -0,0 +1,85 @@
+"""Compiled question payloads for the take-test page.
+
+The questions of a mock test, with their options but without correct answers
+or explanations, are serialised once into immutable tuples and cached under
+the ``mocktest``/``question`` generation stamps. Each process also keeps the
+most recently used payloads in memory, so a class starting the same test at
+once is served without touching the questions table.
+"""
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.core.cache import cache
+
+from main import page_cache
+
+from .models import MockTest, Question
+
+PAYLOAD_TIMEOUT = 60 * 60
+
+# Payloads kept in process memory, least recently used evicted first
+LOCAL_PAYLOADS = 32
+
+
+class QuestionEntry(NamedTuple):
+    id: int
+    number: int
+    question_text: str
+    question_type: str
+    # (key, label) pairs in display order
+    options: tuple
+    marks: int
+
+
+class TestPayload(NamedTuple):
+    mock_test_id: int
+    title: str
+    duration_minutes: int
+    questions: tuple
+    question_ids: frozenset
+
+
+_lock = threading.Lock()
+_local = OrderedDict()
+
+
+def _compile(mock_test_id):
+    test = MockTest.objects.only('id', 'title', 'duration_minutes').get(pk=mock_test_id)
+    rows = Question.objects.filter(mock_test_id=mock_test_id).order_by('id').values_list(
+        'id', 'question_text', 'question_type', 'options', 'marks'
+    )
+    questions = tuple(
+        QuestionEntry(
+            question_id, number, question_text, question_type,
+            tuple((str(key), str(label)) for key, label in (options or {}).items()), marks,
+        )
+        for number, (question_id, question_text, question_type, options, marks) in enumerate(rows, start=1)
+    )
+    return TestPayload(
+        test.id, test.title, test.duration_minutes, questions,
+        frozenset(question.id for question in questions),
+    )
+
+
+def get_payload(mock_test_id):
+    """Question payload for a mock test, rebuilt only after the test or its questions change."""
+    stamps = '.'.join(str(stamp) for stamp in page_cache.generations(('mocktest', 'question')))
+    key = f'test-payload:{mock_test_id}:{stamps}'
+
+    with _lock:
+        payload = _local.get(key)
+        if payload is not None:
+            _local.move_to_end(key)
+            return payload
+
+    payload = cache.get(key)
+    if payload is None:
+        payload = _compile(mock_test_id)
+        cache.set(key, payload, PAYLOAD_TIMEOUT)
+
+    with _lock:
+        _local[key] = payload
+        while len(_local) > LOCAL_PAYLOADS:
+            _local.popitem(last=False)
+    return payload
@@ -0,0 +1,178 @@
+"""Shared question pool and random paper assembly.
+
+Every question, whichever test it was written for, is indexed in process
+memory by ``(topic, difficulty, type)``. The index is rebuilt only when the
+``question`` generation stamp moves (or after ``MAX_POOL_AGE`` seconds).
+A test with a blueprint gets a fresh paper per attempt: the requested number
+of questions is split over difficulties by the blueprint's mix and over the
+test's topics evenly, drawn from the index, shuffled, and stored on the
+attempt as a list of ids. Assembly touches no database rows.
+"""
+import random
+import threading
+import time
+from typing import NamedTuple
+
+from main import page_cache
+from main.taxonomy import get_taxonomy
+
+from .models import MockTest, Question
+from . import payload
+from .payload import QuestionEntry
+
+MAX_POOL_AGE = 300
+
+DIFFICULTIES = tuple(value for value, _ in MockTest.DIFFICULTY_CHOICES)
+QUESTION_TYPES = tuple(value for value, _ in Question.QUESTION_TYPES)
+
+
+class PoolQuestion(NamedTuple):
+    id: int
+    topic_id: int
+    difficulty: str
+    question_type: str
+    marks: int
+    correct_answer: str
+    # What the take-test page shows; ``number`` is filled in per paper
+    entry: QuestionEntry
+
+
+class AssemblyError(Exception):
+    pass
+
+
+class QuestionPool:
+    def __init__(self, questions, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.questions = questions
+        index = {}
+        for question in questions.values():
+            key = (question.topic_id, question.difficulty, question.question_type)
+            index.setdefault(key, []).append(question.id)
+        self.index = {key: tuple(ids) for key, ids in index.items()}
+
+    @classmethod
+    def load(cls, version):
+        rows = Question.objects.order_by('id').values_list(
+            'id', 'topic_id', 'difficulty', 'question_type', 'marks', 'correct_answer', 'question_text', 'options',
+        ).iterator(chunk_size=2000)
+        questions = {}
+        for question_id, topic_id, difficulty, question_type, marks, correct_answer, text, options in rows:
+            entry = QuestionEntry(
+                question_id, 0, text, question_type,
+                tuple((str(key), str(label)) for key, label in (options or {}).items()), marks,
+            )
+            questions[question_id] = PoolQuestion(
+                question_id, topic_id, difficulty, question_type, marks, correct_answer, entry
+            )
+        return cls(questions, version)
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.loaded_at < MAX_POOL_AGE
+
+    def ids(self, topic_id, difficulty, types):
+        found = []
+        for question_type in types:
+            found.extend(self.index.get((topic_id, difficulty, question_type), ()))
+        return found
+
+    def entries(self, question_ids):
+        """Take-test entries for ``question_ids``, numbered in order; unknown ids are skipped."""
+        entries = []
+        for question_id in question_ids:
+            question = self.questions.get(question_id)
+            if question is not None:
+                entries.append(question.entry._replace(number=len(entries) + 1))
+        return tuple(entries)
+
+
+_lock = threading.Lock()
+_pool = None
+
+
+def get_pool():
+    global _pool
+    version = tuple(page_cache.generations(('question',)))
+    pool = _pool
+    if pool is not None and pool.is_current(version):
+        return pool
+    with _lock:
+        if _pool is None or not _pool.is_current(version):
+            _pool = QuestionPool.load(version)
+        return _pool
+
+
+def _apportion(total, weights, rng):
+    """Split ``total`` over ``weights`` by largest remainder, breaking ties at random."""
+    weight_sum = sum(weights.values())
+    if total <= 0 or weight_sum <= 0:
+        return {key: 0 for key in weights}
+    exact = {key: total * weight / weight_sum for key, weight in weights.items()}
+    shares = {key: int(value) for key, value in exact.items()}
+    order = sorted(exact, key=lambda key: (exact[key] - shares[key], rng.random()), reverse=True)
+    for key in order[:total - sum(shares.values())]:
+        shares[key] += 1
+    return shares
+
+
+def blueprint_topics(test):
+    topic_ids = list(test.topics.values_list('id', flat=True))
+    if not topic_ids:
+        subject = get_taxonomy().subject(test.subject_id)
+        topic_ids = [topic.id for topic in subject.topics] if subject else []
+    return topic_ids
+
+
+def assemble(blueprint, topic_ids, pool=None, rng=random):
+    """Draw a shuffled list of question ids following ``blueprint``.
+
+    Each difficulty gets its share of the questions and spreads it evenly
+    over ``topic_ids``; a topic that runs short is topped up from the other
+    topics at the same difficulty, then from any difficulty.
+    """
+    pool = pool or get_pool()
+    total = int(blueprint.get('questions') or 0)
+    types = [t for t in (blueprint.get('types') or QUESTION_TYPES) if t in QUESTION_TYPES]
+    mix = {d: float(w) for d, w in (blueprint.get('difficulty_mix') or {}).items() if d in DIFFICULTIES}
+    if not mix:
+        mix = {difficulty: 1 for difficulty in DIFFICULTIES}
+    if total <= 0 or not topic_ids:
+        raise AssemblyError('The blueprint needs a question count and at least one topic')
+
+    chosen, taken = [], set()
+
+    def draw(candidates, count):
+        available = [question_id for question_id in candidates if question_id not in taken]
+        picked = rng.sample(available, min(count, len(available)))
+        chosen.extend(picked)
+        taken.update(picked)
+        return len(picked)
+
+    for difficulty, count in _apportion(total, mix, rng).items():
+        quotas = _apportion(count, {topic_id: 1 for topic_id in topic_ids}, rng)
+        missing = 0
+        for topic_id, quota in quotas.items():
+            missing += quota - draw(pool.ids(topic_id, difficulty, types), quota)
+        if missing:
+            draw([q for topic_id in topic_ids for q in pool.ids(topic_id, difficulty, types)], missing)
+
+    if len(chosen) < total:
+        draw([
+            question_id for topic_id in topic_ids for difficulty in DIFFICULTIES
+            for question_id in pool.ids(topic_id, difficulty, types)
+        ], total - len(chosen))
+    if not chosen:
+        raise AssemblyError('No questions in the pool match this blueprint')
+
+    rng.shuffle(chosen)
+    return chosen
+
+
+def attempt_payload(attempt):
+    """Take-test payload for ``attempt``: the test's own questions, or its assembled paper."""
+    base = payload.get_payload(attempt.mock_test_id)
+    if not attempt.question_ids:
+        return base
+    questions = get_pool().entries(attempt.question_ids)
+    return base._replace(questions=questions, question_ids=frozenset(question.id for question in questions))
@@ -0,0 +1,110 @@
+"""Incrementally maintained leaderboard.
+
+A completed attempt adds its score to the user's own ``Leaderboard`` row and
+touches no other row, so concurrent submissions never wait on each other's
+locks. Ranks are competition ranks on ``total_score`` (1, 2, 2, 4), i.e. one
+plus the number of strictly higher scores. Pages read them live from counts
+over the indexed score column (:func:`rank_for_score`, :func:`live_ranks`).
+The stored ``rank`` column is only refreshed in bulk by :func:`rerank`; run
+it periodically with ``manage.py rerank_leaderboard``.
+"""
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum, Window
+from django.db.models.functions import Rank
+
+from .models import Leaderboard, TestAttempt
+
+RERANK_BATCH_SIZE = 500
+
+
+def rank_for_score(total_score):
+    return Leaderboard.objects.filter(total_score__gt=total_score).count() + 1
+
+
+def rank_of(user):
+    """Current rank of ``user``, or None if they are not on the leaderboard."""
+    entry = Leaderboard.objects.filter(user=user).only('total_score').first()
+    return rank_for_score(entry.total_score) if entry else None
+
+
+def live_ranks(entries):
+    """Set ``rank`` on ``entries``, a run of rows in ``('-total_score', 'id')`` order, from two counts."""
+    entries = list(entries)
+    if not entries:
+        return entries
+    first = entries[0]
+    above = Leaderboard.objects.filter(total_score__gt=first.total_score).count()
+    # Rows tied with the first one that sort before it, e.g. on an earlier page
+    tied_before = Leaderboard.objects.filter(total_score=first.total_score, id__lt=first.id).count()
+    for index, entry in enumerate(entries):
+        if entry.total_score == first.total_score:
+            entry.rank = above + 1
+        elif entry.total_score == entries[index - 1].total_score:
+            entry.rank = entries[index - 1].rank
+        else:
+            entry.rank = above + tied_before + index + 1
+    return entries
+
+
+def record_attempt(user_id, score, percentage):
+    """Add one completed attempt to the user's row."""
+    return record_attempts(user_id, [score], [percentage])
+
+
+def record_attempts(user_id, scores, percentages):
+    """Add several completed attempts of one user to their row; no other row is read or written."""
+    with transaction.atomic():
+        entry = Leaderboard.objects.select_for_update().filter(user_id=user_id).first()
+        if entry is None:
+            entry = Leaderboard(user_id=user_id)
+
+        entry.average_percentage = (
+            entry.average_percentage * entry.tests_completed + sum(percentages)
+        ) / (entry.tests_completed + len(percentages))
+        entry.tests_completed += len(percentages)
+        entry.total_score += sum(scores)
+        entry.save()
+    return entry
+
+
+def rebuild_totals():
+    """Recompute every row's totals from completed attempts; returns the number of rows."""
+    stats = (
+        TestAttempt.objects.filter(is_completed=True).order_by().values('user_id')
+        .annotate(total=Sum('total_score'), completed=Count('id'), average=Avg('percentage'))
+    )
+    with transaction.atomic():
+        entries = {entry.user_id: entry for entry in Leaderboard.objects.all()}
+        changed, created = [], []
+        for row in stats:
+            entry = entries.pop(row['user_id'], None)
+            if entry is None:
+                entry = Leaderboard(user_id=row['user_id'])
+                created.append(entry)
+            else:
+                changed.append(entry)
+            entry.total_score = row['total'] or 0
+            entry.tests_completed = row['completed']
+            entry.average_percentage = row['average'] or 0
+        Leaderboard.objects.bulk_update(
+            changed, ['total_score', 'tests_completed', 'average_percentage'], batch_size=RERANK_BATCH_SIZE
+        )
+        Leaderboard.objects.bulk_create(created, batch_size=RERANK_BATCH_SIZE)
+        # Users without completed attempts any more
+        Leaderboard.objects.filter(pk__in=[entry.pk for entry in entries.values()]).delete()
+    return len(changed) + len(created)
+
+
+def rerank():
+    """Recompute all ranks in one window-function query; returns the number of rows corrected."""
+    ranked = Leaderboard.objects.annotate(
+        computed_rank=Window(expression=Rank(), order_by=F('total_score').desc())
+    ).only('id', 'rank')
+    stale = []
+    for entry in ranked.iterator(chunk_size=RERANK_BATCH_SIZE):
+        if entry.rank != entry.computed_rank:
+            entry.rank = entry.computed_rank
+            stale.append(entry)
+    with transaction.atomic():
+        Leaderboard.objects.bulk_update(stale, ['rank'], batch_size=RERANK_BATCH_SIZE)
+    return len(stale)
@@ -0,0 +1,171 @@
+"""PDF result reports.
+
+Reports are rendered by the background worker and kept under
+``REPORT_ROOT`` as ``attempt_<id>_<version>.pdf``, where the version is a
+hash of the attempt's result summary. A report is therefore rendered once per
+graded result; later downloads stream the stored file. Submitting a test
+queues its report straight away, so it is usually ready before it is asked for.
+"""
+import hashlib
+import io
+import json
+import logging
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from main import background
+
+from . import grading
+from .models import TestAttempt
+
+logger = logging.getLogger(__name__)
+
+storage = FileSystemStorage(location=settings.REPORT_ROOT)
+
+# Part of every report's version; bump when the layout changes
+REPORT_FORMAT = 1
+
+# How long a queued render blocks another one for the same report
+PENDING_TIMEOUT = 5 * 60
+
+
+def report_version(summary):
+    raw = json.dumps(summary, sort_keys=True) + f'|{REPORT_FORMAT}'
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def report_name(attempt):
+    return f'attempt_{attempt.id}_{report_version(grading.result_summary(attempt))}.pdf'
+
+
+def get_report(attempt):
+    """Name of the attempt's stored report, or None if it has not been rendered yet."""
+    name = report_name(attempt)
+    return name if storage.exists(name) else None
+
+
+def schedule(attempt):
+    """Queue rendering of the attempt's current report unless it exists or is already queued."""
+    name = report_name(attempt)
+    if storage.exists(name):
+        return
+    if cache.add(f'report-pending:{name}', True, PENDING_TIMEOUT):
+        background.submit(render, attempt.id, name)
+
+
+def render(attempt_id, name):
+    attempt = TestAttempt.objects.select_related('mock_test', 'user').filter(pk=attempt_id).first()
+    if attempt is None or report_name(attempt) != name:
+        # Deleted or regraded since this job was queued
+        cache.delete(f'report-pending:{name}')
+        return
+    try:
+        storage.save(name, ContentFile(build_pdf(attempt)))
+        _delete_stale(attempt.id, name)
+    finally:
+        cache.delete(f'report-pending:{name}')
+
+
+def _delete_stale(attempt_id, current):
+    prefix = f'attempt_{attempt_id}_'
+    try:
+        _, files = storage.listdir('')
+    except FileNotFoundError:
+        return
+    for filename in files:
+        if filename.startswith(prefix) and filename != current:
+            try:
+                storage.delete(filename)
+            except OSError:
+                logger.warning('Could not delete stale report %s', filename)
+
+
+def _subject_chart(subjects):
+    drawing = Drawing(16 * cm, 6 * cm)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 1.2 * cm, 1.2 * cm
+    chart.width, chart.height = 14 * cm, 4.4 * cm
+    chart.data = [[round(subject['percentage'], 1) for subject in subjects]]
+    chart.categoryAxis.categoryNames = [subject['name'][:18] for subject in subjects]
+    chart.categoryAxis.labels.fontSize = 7
+    chart.valueAxis.valueMin, chart.valueAxis.valueMax, chart.valueAxis.valueStep = 0, 100, 20
+    chart.bars[0].fillColor = colors.HexColor('#3b82f6')
+    drawing.add(chart)
+    return drawing
+
+
+def build_pdf(attempt):
+    """Full report for a completed attempt as PDF bytes."""
+    summary = grading.result_summary(attempt)
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph('GATE Mining Prep - Test Report', styles['Title']),
+        Paragraph(escape(attempt.mock_test.title), styles['Heading2']),
+        Paragraph(escape(f'Student: {attempt.user.get_full_name() or attempt.user.username}'), styles['Normal']),
+        Spacer(1, 0.4 * cm),
+    ]
+
+    overview = Table([
+        ['Score', f'{attempt.total_score:g}/{attempt.mock_test.total_marks}'],
+        ['Percentage', f'{attempt.percentage:.1f}%'],
+        ['Correct answers', f"{summary['correct']}/{summary['total']}"],
+        ['Answered', f"{summary['answered']}/{summary['total']}"],
+        ['Time taken', f"{summary['time_taken_minutes']} minutes"],
+    ], colWidths=[5 * cm, 6 * cm])
+    overview.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#eef2ff')),
+    ]))
+    story += [overview, Spacer(1, 0.6 * cm)]
+
+    if summary['subjects']:
+        story += [
+            Paragraph('Subject-wise Performance', styles['Heading2']),
+            _subject_chart(summary['subjects']),
+        ]
+    if summary['topics']:
+        topic_rows = [['Topic', 'Subject', 'Correct', '%']] + [
+            [Paragraph(escape(topic['name']), styles['Normal']), Paragraph(escape(topic['subject']), styles['Normal']),
+             f"{topic['correct']}/{topic['total']}", f"{topic['percentage']:.0f}%"]
+            for topic in summary['topics']
+        ]
+        topics = Table(topic_rows, colWidths=[6 * cm, 5 * cm, 2.5 * cm, 2 * cm], repeatRows=1)
+        topics.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eef2ff')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        story += [topics, Spacer(1, 0.6 * cm)]
+
+    story.append(Paragraph('Question Analysis', styles['Heading2']))
+    answers = attempt.answers.select_related('question').order_by('question_id')
+    for number, answer in enumerate(answers, start=1):
+        question = answer.question
+        verdict = '<font color="#059669">Correct</font>' if answer.is_correct else '<font color="#dc2626">Incorrect</font>'
+        story += [
+            Paragraph(f'<b>Question {number}</b> - {verdict} ({answer.marks_obtained:g}/{question.marks})', styles['Normal']),
+            Paragraph(escape(question.question_text), styles['Normal']),
+            Paragraph(f'Your answer: {escape(answer.user_answer) or "<i>Not answered</i>"}', styles['Normal']),
+            Paragraph(f'Correct answer: {escape(question.correct_answer)}', styles['Normal']),
+        ]
+        if question.explanation:
+            story.append(Paragraph(f'<i>Explanation:</i> {escape(question.explanation)}', styles['Normal']))
+        story.append(Spacer(1, 0.4 * cm))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(
+        buffer, pagesize=A4, title=f'Test report {attempt.id}',
+        leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm,
+    ).build(story)
+    return buffer.getvalue()
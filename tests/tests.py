@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from . import ranking
+from .models import Leaderboard
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f'student{index}') for index in range(4)]
+
+    def record(self, index, score):
+        ranking.record_attempt(self.users[index].id, score, score)
+
+    def ordered(self):
+        return ranking.live_ranks(Leaderboard.objects.order_by('-total_score', 'id'))
+
+    def test_tied_scores_share_a_rank(self):
+        self.record(0, 50)
+        self.record(1, 50)
+        self.record(2, 30)
+
+        self.assertEqual([entry.rank for entry in self.ordered()], [1, 1, 3])
+        self.assertEqual(ranking.rank_of(self.users[1]), 1)
+        self.assertEqual(ranking.rank_of(self.users[2]), 3)
+
+    def test_overtaking_moves_the_live_rank(self):
+        self.record(0, 50)
+        self.record(1, 40)
+        self.record(2, 40)
+        self.record(2, 20)
+
+        self.assertEqual(ranking.rank_of(self.users[2]), 1)
+        self.assertEqual(ranking.rank_of(self.users[0]), 2)
+        self.assertEqual(ranking.rank_of(self.users[1]), 3)
+        self.assertEqual([entry.user_id for entry in self.ordered()], [self.users[i].id for i in (2, 0, 1)])
+
+    def test_record_leaves_other_rows_alone(self):
+        self.record(0, 50)
+        ranking.rerank()
+        self.record(1, 80)
+
+        self.assertEqual(Leaderboard.objects.get(user=self.users[0]).rank, 1)
+        self.assertEqual(ranking.rank_of(self.users[0]), 2)
+
+    def test_rerank_matches_live_ranks(self):
+        for index, score in enumerate([30, 70, 70, 10]):
+            self.record(index, score)
+        ranking.rerank()
+
+        stored = list(Leaderboard.objects.order_by('-total_score', 'id').values_list('rank', flat=True))
+        self.assertEqual(stored, [entry.rank for entry in self.ordered()])
+        self.assertEqual(stored, [1, 1, 3, 4])
+
+    def test_ties_split_across_pages(self):
+        for index in range(3):
+            self.record(index, 60)
+        self.record(3, 10)
+
+        second_page = ranking.live_ranks(Leaderboard.objects.order_by('-total_score', 'id')[2:])
+        self.assertEqual([entry.rank for entry in second_page], [1, 4])
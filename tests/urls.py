@@ -8,9 +8,14 @@ urlpatterns = [
     path('<int:test_id>/', views.test_detail, name='test_detail'),
     path('<int:test_id>/start/', views.start_test, name='start_test'),
     path('attempt/<int:attempt_id>/', views.take_test, name='take_test'),
+    path('attempt/<int:attempt_id>/autosave/', views.autosave_answers, name='autosave_answers'),
+    path('attempt/<int:attempt_id>/answer/', views.answer_question, name='answer_question'),
     path('attempt/<int:attempt_id>/submit/', views.submit_test, name='submit_test'),
     path('results/<int:attempt_id>/', views.test_results, name='test_results'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
     path('export/<int:attempt_id>/pdf/', views.export_pdf, name='export_pdf'),
+    path('<int:test_id>/export/', views.export_class_results, name='export_class_results'),
     path('create/', views.create_test, name='create_test'),
+    path('questions/import/', views.import_questions, name='import_questions'),
+    path('questions/analysis/', views.item_analysis, name='item_analysis'),
 ]
\ No newline at end of file
@@ -1,19 +1,20 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.utils import timezone
-from django.db.models import Avg, Count, F
-from .models import MockTest, Question, TestAttempt, Answer, Leaderboard
+from django.db import transaction
+from .models import MockTest, Question, TestAttempt, Leaderboard, QuestionStatistics
 from main.models import Subject, Topic
+from main.conditional import conditional_page
+from main.page_cache import cache_anonymous_page
+from main.pagination import CursorPaginator
+from main.taxonomy import get_taxonomy
 import json
 from datetime import timedelta
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import io
 from django.contrib.auth.decorators import user_passes_test
-from .forms import MockTestCreateForm
+from .forms import MockTestCreateForm, QuestionImportForm
+from . import adaptive, autosave, class_export, deadlines, distribution, grading, importer, question_pool, ranking, reports
 
 
 def is_student(user):
@@ -22,9 +23,11 @@ def is_student(user):
     except Exception:
         return False
 
+@conditional_page('mocktest', 'question', 'subject')
+@cache_anonymous_page('mocktest', 'question', 'subject')
 def test_list(request):
     tests = MockTest.objects.filter(is_active=True)
-    subjects = Subject.objects.all()
+    subjects = get_taxonomy().subjects
     
     # Filtering
     subject_filter = request.GET.get('subject')
@@ -36,8 +39,11 @@ def test_list(request):
     if difficulty_filter:
         tests = tests.filter(difficulty=difficulty_filter)
     
+    page_obj = CursorPaginator(tests, 12).get_page(request.GET.get('cursor'))
+    
     context = {
-        'tests': tests,
+        'tests': page_obj.object_list,
+        'page_obj': page_obj,
         'subjects': subjects,
         'current_subject': int(subject_filter) if subject_filter else None,
         'current_difficulty': difficulty_filter,
@@ -55,9 +61,14 @@ def test_detail(request, test_id):
             is_completed=True
         )[:5]
     
+    score_counts = distribution.get_counts(test.id)
+    
     context = {
         'test': test,
         'user_attempts': user_attempts,
+        'score_chart': distribution.chart(score_counts),
+        'attempt_total': sum(score_counts),
+        'can_export': request.user.is_authenticated and is_professor(request.user),
     }
     return render(request, 'tests/test_detail.html', context)
 
@@ -73,13 +84,34 @@ def start_test(request, test_id):
         is_completed=False
     ).first()
     
-    if incomplete_attempt:
+    # Resume an open attempt; one whose time ran out is graded first and a new one started
+    if incomplete_attempt and not deadlines.is_expired(incomplete_attempt):
         return redirect('tests:take_test', attempt_id=incomplete_attempt.id)
+    if incomplete_attempt:
+        deadlines.expire([incomplete_attempt.id])
+    
+    # A blueprint test draws a fresh paper from the question pool for every attempt;
+    # an adaptive test starts with one question and picks the rest as answers come in
+    question_ids = []
+    if test.is_adaptive:
+        first = adaptive.first_question(test)
+        if first is None:
+            messages.error(request, 'This test cannot be started yet: no questions are available for its topics.')
+            return redirect('tests:test_detail', test_id=test.id)
+        question_ids = [first]
+    elif test.is_randomized:
+        try:
+            question_ids = question_pool.assemble(test.blueprint, question_pool.blueprint_topics(test))
+        except question_pool.AssemblyError as exc:
+            messages.error(request, f'This test cannot be started yet: {exc}.')
+            return redirect('tests:test_detail', test_id=test.id)
     
     # Create new attempt
     attempt = TestAttempt.objects.create(
         user=request.user,
-        mock_test=test
+        mock_test=test,
+        question_ids=question_ids,
+        deadline=deadlines.deadline_for(test)
     )
     
     return redirect('tests:take_test', attempt_id=attempt.id)
@@ -92,144 +124,189 @@ def take_test(request, attempt_id):
     if attempt.is_completed:
         return redirect('tests:test_results', attempt_id=attempt.id)
     
-    questions = attempt.mock_test.questions.all()
+    if deadlines.is_expired(attempt):
+        deadlines.expire([attempt.id])
+        messages.info(request, 'Time is up for this test; your saved answers have been submitted.')
+        return redirect('tests:test_results', attempt_id=attempt.id)
     
-    # Get existing answers
-    existing_answers = {
-        answer.question.id: answer.user_answer 
-        for answer in attempt.answers.all()
-    }
+    if attempt.mock_test.is_adaptive:
+        return _take_adaptive_test(request, attempt)
+    
+    # Questions come from the shared compiled payload (or pool, for assembled papers); only answers are per attempt
+    test_payload = question_pool.attempt_payload(attempt)
+    
+    # Saved answers, overlaid with any autosaved ones not yet flushed
+    existing_answers = dict(attempt.answers.values_list('question_id', 'user_answer'))
+    existing_answers.update(autosave.buffered_answers(attempt.id))
     
     context = {
         'attempt': attempt,
-        'questions': questions,
+        'test': test_payload,
+        'questions': test_payload.questions,
         'existing_answers': existing_answers,
+        'seconds_left': deadlines.seconds_left(attempt),
     }
     return render(request, 'tests/take_test.html', context)
 
+def _take_adaptive_test(request, attempt):
+    test = attempt.mock_test
+    question = question_pool.get_pool().entries(attempt.question_ids[-1:])
+    context = {
+        'attempt': attempt,
+        'test': test,
+        'question': question[0]._replace(number=len(attempt.question_ids)) if question else None,
+        'total_questions': test.question_count,
+        'seconds_left': deadlines.seconds_left(attempt),
+    }
+    return render(request, 'tests/take_adaptive_test.html', context)
+
 @login_required
 @user_passes_test(is_student)
 @require_POST
-def submit_test(request, attempt_id):
-    attempt = get_object_or_404(TestAttempt, id=attempt_id, user=request.user)
-    
-    if attempt.is_completed:
-        return JsonResponse({'error': 'Test already completed'})
-    
-    # Process answers
-    total_score = 0
-    correct_answers = 0
+def answer_question(request, attempt_id):
+    """Record the answer to an adaptive attempt's current question and move on to the next one."""
+    with transaction.atomic():
+        attempt = get_object_or_404(
+            TestAttempt.objects.select_for_update().select_related('mock_test'), id=attempt_id, user=request.user
+        )
+        
+        if attempt.is_completed:
+            return redirect('tests:test_results', attempt_id=attempt.id)
+        
+        if deadlines.is_expired(attempt):
+            deadlines.expire([attempt.id])
+            messages.info(request, 'Time is up for this test; your saved answers have been submitted.')
+            return redirect('tests:test_results', attempt_id=attempt.id)
+        
+        # A resubmitted or stale form answers a question that is no longer current
+        current = attempt.question_ids[-1] if attempt.question_ids else None
+        if not attempt.mock_test.is_adaptive or request.POST.get('question') != str(current):
+            return redirect('tests:take_test', attempt_id=attempt.id)
+        
+        try:
+            seconds = int(request.POST.get('seconds', 0))
+        except ValueError:
+            seconds = 0
+        answer = request.POST.get(f'question_{current}', '')[:autosave.MAX_ANSWER_LENGTH]
+        if not adaptive.record_answer(attempt, answer, seconds):
+            return redirect('tests:take_test', attempt_id=attempt.id)
+        
+        if grading.grade_attempt(attempt, {}) is None:
+            return redirect('tests:test_results', attempt_id=attempt.id)
+        ranking.record_attempt(request.user.id, attempt.total_score, attempt.percentage)
     
-    for question in attempt.mock_test.questions.all():
-        user_answer = request.POST.get(f'question_{question.id}', '')
+    reports.schedule(attempt)
+    return redirect('tests:test_results', attempt_id=attempt.id)
+
+@login_required
+@user_passes_test(is_student)
+@require_POST
+def submit_test(request, attempt_id):
+    # The attempt row stays locked until grading commits, so a double submit
+    # waits and then sees the attempt as completed
+    with transaction.atomic():
+        attempt = get_object_or_404(
+            TestAttempt.objects.select_for_update(), id=attempt_id, user=request.user
+        )
         
-        # Check if answer is correct
-        is_correct = user_answer.strip().lower() == question.correct_answer.strip().lower()
-        marks_obtained = question.marks if is_correct else 0
+        if attempt.is_completed:
+            return JsonResponse({'error': 'Test already completed'})
         
-        if is_correct:
-            correct_answers += 1
-            total_score += marks_obtained
+        # Too late: grade what was saved by the deadline and ignore the posted answers
+        if deadlines.is_expired(attempt):
+            deadlines.expire([attempt.id])
+            return JsonResponse({
+                'error': 'Time is up; your answers saved before the deadline were submitted.',
+                'redirect_url': f'/tests/results/{attempt.id}/'
+            }, status=403)
         
-        # Save or update answer
-        Answer.objects.update_or_create(
-            test_attempt=attempt,
-            question=question,
-            defaults={
-                'user_answer': user_answer,
-                'is_correct': is_correct,
-                'marks_obtained': marks_obtained,
-            }
+        answer_key = grading.answer_key_for(attempt)
+        submitted = autosave.parse_answers(
+            request.POST, {entry.question_id for entry in answer_key.entries}
         )
+        autosave.discard(attempt.id)
+        if grading.grade_attempt(attempt, submitted) is None:
+            return JsonResponse({'error': 'Test already completed'})
+        
+        # Add this attempt to the user's leaderboard row
+        ranking.record_attempt(request.user.id, attempt.total_score, attempt.percentage)
     
-    # Update attempt
-    attempt.completed_at = timezone.now()
-    attempt.total_score = total_score
-    attempt.percentage = (total_score / attempt.mock_test.total_marks) * 100
-    attempt.time_taken_minutes = int((attempt.completed_at - attempt.started_at).total_seconds() / 60)
-    attempt.is_completed = True
-    attempt.save()
-    
-    # Update user profile
-    profile = request.user.userprofile
-    profile.total_tests_taken += 1
-    profile.save()
-    
-    # Update leaderboard
-    update_leaderboard(request.user)
+    # Most students download the report right after submitting
+    reports.schedule(attempt)
     
     return JsonResponse({
         'success': True,
         'redirect_url': f'/tests/results/{attempt.id}/'
     })
 
+@login_required
+@user_passes_test(is_student)
+@require_POST
+def autosave_answers(request, attempt_id):
+    """Buffer the answers changed since the page's last autosave."""
+    # The row lock serialises autosaves of one attempt and holds them back while it is being graded
+    # (not on SQLite, where select_for_update is a no-op)
+    with transaction.atomic():
+        attempt = get_object_or_404(
+            TestAttempt.objects.select_for_update().only('id', 'mock_test_id', 'is_completed', 'question_ids', 'deadline'),
+            id=attempt_id, user=request.user,
+        )
+        
+        if attempt.is_completed:
+            return JsonResponse({'error': 'Test already completed'}, status=409)
+        if deadlines.is_expired(attempt):
+            return JsonResponse({'error': 'Time is up'}, status=409)
+        
+        answers = autosave.parse_answers(request.POST, question_pool.attempt_payload(attempt).question_ids)
+        flushed = autosave.record(attempt.id, answers)
+    
+    return JsonResponse({'success': True, 'saved': len(answers), 'flushed': flushed})
+
 @login_required
 def test_results(request, attempt_id):
-    attempt = get_object_or_404(TestAttempt, id=attempt_id, user=request.user)
+    attempt = get_object_or_404(TestAttempt.objects.select_related('mock_test'), id=attempt_id, user=request.user)
     
     if not attempt.is_completed:
         return redirect('tests:take_test', attempt_id=attempt.id)
     
+    # Totals and breakdowns were written at grading time; answers are only
+    # needed for the per-question review below
+    summary = grading.result_summary(attempt)
     answers = attempt.answers.all().select_related('question')
-    correct_count = answers.filter(is_correct=True).count()
-    total_questions = answers.count()
-    
-    # Subject-wise performance
-    subject_performance = {}
-    for answer in answers:
-        subject_name = answer.question.topic.subject.name
-        if subject_name not in subject_performance:
-            subject_performance[subject_name] = {'correct': 0, 'total': 0}
-        
-        subject_performance[subject_name]['total'] += 1
-        if answer.is_correct:
-            subject_performance[subject_name]['correct'] += 1
+    subject_performance = {entry['name']: entry for entry in summary['subjects']}
     
-    # Calculate percentages
-    for subject in subject_performance:
-        total = subject_performance[subject]['total']
-        correct = subject_performance[subject]['correct']
-        subject_performance[subject]['percentage'] = (correct / total) * 100 if total > 0 else 0
+    # How this score compares, read from the test's histogram
+    score_counts = distribution.get_counts(attempt.mock_test_id)
     
     context = {
         'attempt': attempt,
         'answers': answers,
-        'correct_count': correct_count,
-        'total_questions': total_questions,
+        'correct_count': summary['correct'],
+        'total_questions': summary['total'],
         'subject_performance': subject_performance,
+        'topic_performance': summary['topics'],
+        'percentile': distribution.percentile(score_counts, attempt.percentage),
+        'score_chart': distribution.chart(score_counts, attempt.percentage),
+        'attempt_total': sum(score_counts),
     }
     return render(request, 'tests/test_results.html', context)
 
 def leaderboard(request):
-    leaderboard_data = Leaderboard.objects.select_related('user').all()[:50]
+    page_obj = CursorPaginator(
+        Leaderboard.objects.select_related('user', 'user__userprofile'),
+        50,
+        ordering=('-total_score', 'id'),
+    ).get_page(request.GET.get('cursor'))
+    # The stored rank lags until the next rerank; show the live one
+    ranking.live_ranks(page_obj.object_list)
     
-    context = {'leaderboard': leaderboard_data}
+    context = {
+        'leaderboard': page_obj.object_list,
+        'page_obj': page_obj,
+        'my_rank': ranking.rank_of(request.user) if request.user.is_authenticated else None,
+    }
     return render(request, 'tests/leaderboard.html', context)
 
-def update_leaderboard(user):
-    attempts = TestAttempt.objects.filter(user=user, is_completed=True)
-    
-    if attempts.exists():
-        total_score = sum(attempt.total_score for attempt in attempts)
-        tests_completed = attempts.count()
-        average_percentage = attempts.aggregate(avg=Avg('percentage'))['avg'] or 0
-        
-        leaderboard, created = Leaderboard.objects.get_or_create(
-            user=user,
-            defaults={
-                'total_score': total_score,
-                'tests_completed': tests_completed,
-                'average_percentage': average_percentage,
-            }
-        )
-        
-        if not created:
-            leaderboard.total_score = total_score
-            leaderboard.tests_completed = tests_completed
-            leaderboard.average_percentage = average_percentage
-            leaderboard.save()
-
-
 def is_professor(user):
     try:
         return user.userprofile.role == 'professor' or user.is_staff
@@ -253,27 +330,93 @@ def create_test(request):
     return render(request, 'tests/create_test.html', {'form': form})
 
 @login_required
-def export_pdf(request, attempt_id):
-    attempt = get_object_or_404(TestAttempt, id=attempt_id, user=request.user)
-    
-    # Create PDF
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    
-    # Add content
-    p.drawString(100, 750, f"GATE Mining Prep - Test Results")
-    p.drawString(100, 720, f"Test: {attempt.mock_test.title}")
-    p.drawString(100, 690, f"Student: {attempt.user.get_full_name() or attempt.user.username}")
-    p.drawString(100, 660, f"Score: {attempt.total_score}/{attempt.mock_test.total_marks}")
-    p.drawString(100, 630, f"Percentage: {attempt.percentage:.1f}%")
-    p.drawString(100, 600, f"Time Taken: {attempt.time_taken_minutes} minutes")
+@user_passes_test(is_professor)
+def import_questions(request):
+    result = None
+    if request.method == 'POST':
+        form = QuestionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            mock_test = form.cleaned_data['mock_test']
+            try:
+                rows = importer.reader_for(upload.name, importer.text_stream(upload.file))
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                result = importer.import_rows(
+                    rows,
+                    default_test_id=mock_test.id if mock_test else None,
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+                if result.created and not form.cleaned_data['dry_run']:
+                    messages.success(request, f'Imported {result.created} questions.')
+    else:
+        form = QuestionImportForm()
     
-    p.showPage()
-    p.save()
+    return render(request, 'tests/import_questions.html', {'form': form, 'result': result})
+
+@login_required
+@user_passes_test(is_professor)
+def item_analysis(request):
+    """Question statistics from the last ``analyze_items`` run, flagged items first by default."""
+    statistics = QuestionStatistics.objects.select_related('question', 'question__mock_test', 'question__topic')
+    show_all = request.GET.get('all') == '1'
+    if not show_all:
+        statistics = statistics.exclude(flags=[])
+    mock_test = None
+    if request.GET.get('test', '').isdigit():
+        mock_test = MockTest.objects.filter(pk=request.GET['test']).only('id', 'title').first()
+        if mock_test:
+            statistics = statistics.filter(question__mock_test=mock_test)
+    page_obj = CursorPaginator(statistics, 50, ordering=('p_value', 'id')).get_page(request.GET.get('cursor'))
     
-    buffer.seek(0)
+    context = {
+        'statistics': page_obj.object_list,
+        'page_obj': page_obj,
+        'show_all': show_all,
+        'mock_test': mock_test,
+        'last_run': QuestionStatistics.objects.order_by('-updated_at').values_list('updated_at', flat=True).first(),
+    }
+    return render(request, 'tests/item_analysis.html', context)
+
+@login_required
+@user_passes_test(is_professor)
+def export_class_results(request, test_id):
+    test = get_object_or_404(MockTest.objects.only('id'), id=test_id)
+    # Built in the background like single reports; large classes take a while
+    name = class_export.get_export(test.id)
+    if name is None:
+        class_export.schedule(test.id)
+        response = render(request, 'tests/report_pending.html', {'test': test, 'retry_after': 10}, status=202)
+        response['Retry-After'] = '10'
+        return response
+    
+    return FileResponse(
+        reports.storage.open(name, 'rb'),
+        as_attachment=True,
+        filename=f'test_{test.id}_results.zip',
+        content_type='application/zip',
+    )
+
+@login_required
+def export_pdf(request, attempt_id):
+    attempt = get_object_or_404(TestAttempt, id=attempt_id, user=request.user)
     
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="test_result_{attempt.id}.pdf"'
+    if not attempt.is_completed:
+        return redirect('tests:take_test', attempt_id=attempt.id)
     
-    return response
\ No newline at end of file
+    # Reports are rendered in the background; until this one is ready,
+    # answer with a page that retries shortly
+    name = reports.get_report(attempt)
+    if name is None:
+        reports.schedule(attempt)
+        response = render(request, 'tests/report_pending.html', {'attempt': attempt}, status=202)
+        response['Retry-After'] = '3'
+        return response
+    
+    return FileResponse(
+        reports.storage.open(name, 'rb'),
+        as_attachment=True,
+        filename=f'test_result_{attempt.id}.pdf',
+        content_type='application/pdf',
+    )
\ No newline at end of file